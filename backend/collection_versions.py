@@ -0,0 +1,43 @@
+"""
+Versões por coleção para GET condicional (ETag / If-None-Match)
+Cada handler de escrita incrementa a versão da coleção; as leituras comparam o
+ETag enviado pelo cliente com a versão atual e respondem 304 sem ir ao banco.
+As versões ficam em memória: vale para o deploy atual, com um único processo uvicorn.
+"""
+
+import uuid
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+class CollectionVersions:
+    def __init__(self):
+        # Muda a cada processo: um ETag de outra instância nunca é aceito por engano
+        self._boot_id = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, collection: str):
+        self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def version(self, collection: str) -> int:
+        return self._versions.get(collection, 0)
+
+    def etag(self, collection: str, variant: str = "") -> str:
+        suffix = f"-{variant}" if variant else ""
+        return f'W/"{collection}-{self._boot_id}-{self.version(collection)}{suffix}"'
+
+    def check(self, request: Request, response: Response, collection: str, variant: str = "") -> Optional[Response]:
+        """Retorna uma resposta 304 se o cliente já tem a versão atual; senão marca o ETag na resposta"""
+        etag = self.etag(collection, variant)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        client_etags = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return None
+
+
+# Instância global
+collection_versions = CollectionVersions()
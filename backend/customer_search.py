@@ -0,0 +1,67 @@
+"""
+Busca de clientes por prefixo (typeahead do atendente)
+Chaves normalizadas compartilhadas pelo servidor online (server.py) e offline
+(desktop/server_offline.py): nome sem acentos e em minúsculas, e telefone só
+com dígitos. Cada cliente guarda seus termos de busca; a consulta é um
+intervalo [prefixo, prefixo + U+FFFF) sobre um índice, então o custo não
+depende do tamanho do cadastro.
+"""
+
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+SEARCH_LIMIT_DEFAULT = 8
+SEARCH_LIMIT_MAX = 50
+
+_SPACES = re.compile(r"\s+")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def fold_text(text: Optional[str]) -> str:
+    """'  José  da Conceição ' -> 'jose da conceicao'"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SPACES.sub(" ", stripped.casefold()).strip()
+
+
+def phone_digits(phone: Optional[str]) -> str:
+    return _NON_DIGITS.sub("", phone or "")
+
+
+def customer_search_terms(name: Optional[str], phone: Optional[str]) -> List[str]:
+    """Termos indexados de um cliente.
+
+    O nome entra a partir de cada palavra ('maria da silva', 'da silva', 'silva'),
+    para que 'silva' encontre 'Maria da Silva'. O telefone entra com e sem DDD.
+    """
+    terms = []
+    words = fold_text(name).split(" ")
+    for idx in range(len(words)):
+        term = " ".join(words[idx:])
+        if term and term not in terms:
+            terms.append(term)
+
+    digits = phone_digits(phone)
+    if digits:
+        terms.append(digits)
+        if len(digits) >= 10:
+            terms.append(digits[2:])
+    return terms
+
+
+def search_key(query: str) -> str:
+    """Chave de busca: só dígitos quando o usuário digita um telefone"""
+    if re.fullmatch(r"[\d\s()+.-]+", query or ""):
+        return phone_digits(query)
+    return fold_text(query)
+
+
+def prefix_range(key: str) -> Tuple[str, str]:
+    """Limites [início, fim) dos termos que começam com `key`"""
+    return key, key + "\uffff"
+
+
+def search_fields(customer: Dict) -> Dict:
+    """Campo a gravar junto com o cliente (MongoDB)"""
+    return {"search_terms": customer_search_terms(customer.get("name"), customer.get("phone"))}
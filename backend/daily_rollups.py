@@ -0,0 +1,223 @@
+"""
+Totais de vendas por dia mantidos incrementalmente (coleção daily_rollups)
+create_order e update_order_status aplicam $inc no documento do dia (UTC, como
+os relatórios). Um relatório de mês ou ano soma 30-365 documentos pequenos em
+vez de varrer todos os pedidos. rebuild() recalcula o histórico a partir dos
+pedidos, incluindo o arquivo (ver rebuild_rollups.py); na primeira subida ele
+roda em startup_event, antes de o servidor aceitar requisições.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from date_migration import parse_stored_date
+
+logger = logging.getLogger(__name__)
+
+STATE_ID = "daily_rollups"
+UNKNOWN_ATTENDANT = "Desconhecido"
+DEFAULT_PAYMENT = "DINHEIRO"
+
+
+def rollup_day(created_at) -> Optional[str]:
+    if not isinstance(created_at, datetime):
+        created_at = parse_stored_date(created_at)
+        if created_at is None:
+            return None
+    return created_at.astimezone(timezone.utc).date().isoformat()
+
+
+def field_key(value: str) -> str:
+    """Nome de campo seguro para o MongoDB ('.' e '$' têm significado especial)"""
+    return (value or "").replace(".", "_").replace("$", "_") or "_"
+
+
+def order_increments(order: Dict, count: int = 1) -> Dict[str, float]:
+    """Campos $inc de um pedido no documento do dia; count=-1 desfaz"""
+    total = (order.get("total_price") or 0) * count
+    payment = field_key(order.get("payment_method") or DEFAULT_PAYMENT)
+    attendant = field_key(order.get("attendant_name") or UNKNOWN_ATTENDANT)
+    inc: Dict[str, float] = defaultdict(int)
+    inc["total_orders"] += count
+    inc["total_revenue"] += total
+    inc[f"status.{field_key(order.get('status') or 'pending')}"] += count
+    inc[f"payment.{payment}.count"] += count
+    inc[f"payment.{payment}.total"] += total
+    inc[f"attendants.{attendant}.count"] += count
+    inc[f"attendants.{attendant}.total"] += total
+    for item in order.get("items") or []:
+        if item.get("size"):
+            inc[f"sizes.{field_key(item['size'])}"] += count
+    return dict(inc)
+
+
+def nested_document(fields: Dict) -> Dict:
+    """{"payment.PIX.count": 2} -> {"payment": {"PIX": {"count": 2}}}"""
+    doc: Dict = {}
+    for path, value in fields.items():
+        *parents, leaf = path.split(".")
+        target = doc
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = value
+    return doc
+
+
+def order_labels(order: Dict) -> Dict[str, str]:
+    """Nomes originais (antes de field_key), gravados com $set"""
+    payment = order.get("payment_method") or DEFAULT_PAYMENT
+    attendant = order.get("attendant_name") or UNKNOWN_ATTENDANT
+    return {
+        f"payment.{field_key(payment)}.name": payment,
+        f"attendants.{field_key(attendant)}.name": attendant,
+    }
+
+
+class DailyRollups:
+    def __init__(self, db, date_range, archive):
+        """`date_range` monta o filtro de created_at; `archive` é o OrderArchive (para o rebuild)"""
+        self.db = db
+        self.date_range = date_range
+        self.archive = archive
+        self.ready = False           # histórico já reconstruído: relatórios podem usar os rollups
+
+    async def load_state(self):
+        state = await self.db.migrations.find_one({"_id": STATE_ID}) or {}
+        self.ready = bool(state.get("built"))
+
+    # ===== Atualização incremental =====
+    async def _apply(self, day: Optional[str], inc: Dict[str, float], labels: Optional[Dict] = None):
+        if not day:
+            return
+        update = {"$inc": inc, "$setOnInsert": {"date": day}}
+        if labels:
+            update["$set"] = labels
+        await self.db.daily_rollups.update_one({"_id": day}, update, upsert=True)
+
+    async def record_created(self, order: Dict):
+        await self._apply(rollup_day(order.get("created_at")), order_increments(order), order_labels(order))
+
+    async def record_status_change(self, before: Dict, new_status: str):
+        old_status = before.get("status") or "pending"
+        if old_status == new_status:
+            return
+        await self._apply(rollup_day(before.get("created_at")), {
+            f"status.{field_key(old_status)}": -1,
+            f"status.{field_key(new_status)}": 1,
+        })
+
+    # ===== Relatório =====
+    async def report(self, start: date, end: date) -> Dict:
+        """Mesmo formato de build_sales_report, somando os documentos do intervalo"""
+        docs = await self.db.daily_rollups.find(
+            {"_id": {"$gte": start.isoformat(), "$lte": end.isoformat()}}
+        ).sort("_id", 1).to_list(None)
+
+        status_counts: Dict[str, int] = defaultdict(int)
+        sizes: Dict[str, int] = defaultdict(int)
+        payments: Dict[str, Dict] = {}
+        attendants: Dict[str, Dict] = {}
+        days = []
+        total_orders, total_revenue = 0, 0.0
+
+        for doc in docs:
+            if not doc.get("total_orders"):
+                continue
+            total_orders += doc["total_orders"]
+            total_revenue += doc.get("total_revenue", 0)
+            days.append({"date": doc["_id"], "count": doc["total_orders"], "total": round(doc.get("total_revenue", 0), 2)})
+            for status, count in (doc.get("status") or {}).items():
+                status_counts[status] += count
+            for size, count in (doc.get("sizes") or {}).items():
+                sizes[size] += count
+            for target, values in ((payments, doc.get("payment")), (attendants, doc.get("attendants"))):
+                for key, row in (values or {}).items():
+                    acc = target.setdefault(key, {"name": row.get("name", key), "count": 0, "total": 0.0})
+                    acc["count"] += row.get("count", 0)
+                    acc["total"] += row.get("total", 0)
+
+        def ranked(rows: Dict, label: str) -> List[Dict]:
+            return sorted(
+                ({label: r["name"], "count": r["count"], "total": round(r["total"], 2)} for r in rows.values() if r["count"]),
+                key=lambda r: r["total"], reverse=True,
+            )
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total_orders": total_orders,
+            "total_revenue": round(total_revenue, 2),
+            "status_counts": {s: c for s, c in status_counts.items() if c},
+            "marmitas_by_size": {"P": 0, "M": 0, "G": 0, **sizes},
+            "sales_by_attendant": ranked(attendants, "attendant_name"),
+            "sales_by_payment": ranked(payments, "payment_method"),
+            "days": days,
+        }
+
+    # ===== Reconstrução =====
+    async def rebuild(self, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """Recalcula os dias de [start, end] (padrão: todo o histórico) a partir dos pedidos.
+
+        Cada dia é gravado inteiro com replace_one, sem apagar antes. Ainda assim, um
+        pedido criado ou alterado entre a leitura e a gravação do seu dia se perde:
+        com o servidor no ar, limite o intervalo a dias passados.
+        """
+        range_start = datetime.combine(start or date.min, datetime.min.time(), tzinfo=timezone.utc)
+        range_end = (
+            datetime.combine(end + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+            if end else datetime.max.replace(tzinfo=timezone.utc)
+        )
+        query = self.date_range(range_start, range_end)
+        projection = {"_id": 0, "created_at": 1, "status": 1, "total_price": 1,
+                      "payment_method": 1, "attendant_name": 1, "items.size": 1}
+
+        await self.archive.refresh_months()
+        collections = [*self.archive.collections_for_range(range_start, range_end if end else None), "orders"]
+        totals: Dict[str, Dict[str, float]] = {}
+        labels: Dict[str, Dict[str, str]] = {}
+        for name in collections:
+            async for order in self.db[name].find(query, projection):
+                day = rollup_day(order.get("created_at"))
+                if not day:
+                    continue
+                day_totals = totals.setdefault(day, defaultdict(int))
+                for field, value in order_increments(order).items():
+                    day_totals[field] += value
+                labels.setdefault(day, {}).update(order_labels(order))
+
+        for day, day_totals in totals.items():
+            doc = nested_document({**day_totals, **labels[day]})
+            await self.db.daily_rollups.replace_one({"_id": day}, {"date": day, **doc}, upsert=True)
+        # Dias do intervalo que não têm mais pedidos
+        day_filter = {"$nin": list(totals)}
+        if start:
+            day_filter["$gte"] = start.isoformat()
+        if end:
+            day_filter["$lte"] = end.isoformat()
+        await self.db.daily_rollups.delete_many({"_id": day_filter})
+
+        if start is None and end is None:
+            await self.db.migrations.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"built": True, "built_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+            self.ready = True
+        logger.info(f"daily_rollups recalculado: {len(totals)} dias")
+        return len(totals)
+
+    async def ensure_built(self):
+        """Primeira execução: reconstrói o histórico antes de o servidor aceitar requisições.
+
+        Em segundo plano, os $inc de create_order/update_order_status disputariam
+        os mesmos documentos com o rebuild. Se falhar, os relatórios seguem pelos
+        pedidos e a próxima subida tenta de novo.
+        """
+        if self.ready:
+            return
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Reconstrução de daily_rollups falhou (relatórios seguem pelos pedidos): {e}")
@@ -0,0 +1,144 @@
+"""
+Migração de datas gravadas como texto (ISO 8601) para datetime nativo do BSON
+Versões anteriores gravavam created_at/updated_at com isoformat(). Os novos
+registros já usam datetime; esta migração converte os antigos em segundo plano,
+em lotes, sem parar o servidor. O progresso fica em db.migrations, então um
+restart continua de onde parou. Enquanto ela não termina, os filtros de data
+consideram os dois formatos (ver created_at_range).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "native_datetimes"
+BATCH_SIZE = 500
+BATCH_PAUSE = 0.05           # segundos entre lotes, para não disputar o banco com o atendimento
+
+# (coleção, campo) convertidos
+DATE_FIELDS: List[Tuple[str, str]] = [
+    ("orders", "created_at"),
+    ("customers", "created_at"),
+    ("products", "created_at"),
+    ("users", "created_at"),
+    ("settings", "updated_at"),
+]
+
+
+def parse_stored_date(value) -> Optional[datetime]:
+    """Texto ISO 8601 gravado pelas versões antigas -> datetime em UTC"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class DateMigration:
+    def __init__(self, db):
+        self.db = db
+        self.done = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def load_state(self) -> Dict:
+        state = await self.db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+        self.done = bool(state.get("done"))
+        return state
+
+    async def status(self) -> Dict:
+        state = await self.load_state()
+        pending = {}
+        for collection, field in DATE_FIELDS:
+            pending[f"{collection}.{field}"] = await self.db[collection].count_documents({field: {"$type": "string"}})
+        return {
+            "done": self.done,
+            "converted": state.get("converted", 0),
+            "invalid": state.get("invalid", 0),
+            "pending": pending,
+            "running": self._task is not None and not self._task.done(),
+        }
+
+    async def _migrate_field(self, collection: str, field: str, state: Dict):
+        key = f"{collection}.{field}"
+        last_id = state.get("last_ids", {}).get(key)
+        while True:
+            query = {field: {"$type": "string"}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await self.db[collection].find(query, {"_id": 1, field: 1}).sort("_id", 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+            if not batch:
+                return
+
+            updates, invalid = [], 0
+            for doc in batch:
+                parsed = parse_stored_date(doc[field])
+                if parsed is None:
+                    invalid += 1
+                    continue
+                # Filtra pelo valor antigo: se o documento mudou nesse meio-tempo, não sobrescreve
+                updates.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: parsed}}))
+            converted = 0
+            if updates:
+                result = await self.db[collection].bulk_write(updates, ordered=False)
+                converted = result.modified_count
+
+            # Checkpoint: um restart retoma após o último _id processado
+            last_id = batch[-1]["_id"]
+            await self.db.migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {f"last_ids.{key}": last_id}, "$inc": {"converted": converted, "invalid": invalid}},
+                upsert=True,
+            )
+            await asyncio.sleep(BATCH_PAUSE)
+
+    async def run(self):
+        state = await self.load_state()
+        if self.done:
+            return
+        try:
+            for collection, field in DATE_FIELDS:
+                await self._migrate_field(collection, field, state)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Migração de datas interrompida (continua no próximo restart): {e}")
+            return
+
+        await self.db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"done": True, "finished_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        self.done = True
+        state = await self.load_state()
+        logger.info(f"Migração de datas concluída: {state.get('converted', 0)} convertidas, "
+                    f"{state.get('invalid', 0)} inválidas")
+
+    def start(self):
+        if self._task is None and not self.done:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def created_at_range(self, start: datetime, end: datetime, field: str = "created_at") -> Dict:
+        """Filtro [start, end) que, durante a migração, também casa datas ainda em texto"""
+        native = {field: {"$gte": start, "$lt": end}}
+        if self.done:
+            return native
+        # No BSON, comparações não cruzam tipos: cada ramo só casa o seu formato
+        legacy = {field: {"$gte": start.isoformat(), "$lt": end.isoformat()}}
+        return {"$or": [native, legacy]}
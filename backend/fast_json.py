@@ -0,0 +1,40 @@
+"""
+Resposta JSON rápida para as listagens (pedidos, produtos, clientes, usuários)
+Com response_model, o FastAPI valida a lista inteira com o pydantic, converte
+tudo com jsonable_encoder e só então serializa com o json da biblioteca padrão.
+Os documentos do banco foram gravados pelos próprios modelos (model_dump), então
+aqui eles são tratados como confiáveis: só se recortam os campos do modelo e o
+orjson gera os bytes. Documentos antigos sem algum campo passam pelo modelo,
+que completa os valores padrão.
+Os handlers mantêm response_model para a documentação (OpenAPI); como devolvem
+um Response pronto, o FastAPI não valida de novo.
+"""
+
+from typing import Dict, Iterable, Optional, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class ListEncoder:
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        self._required = frozenset(self.fields)
+
+    def _row(self, doc: Dict) -> Dict:
+        if self._required <= doc.keys():
+            return {name: doc[name] for name in self.fields}
+        # Documento antigo/incompleto: o modelo preenche os padrões
+        return self.model.model_validate(doc).model_dump(mode="json")
+
+    def encode(self, docs: Iterable[Dict]) -> bytes:
+        return orjson.dumps([self._row(doc) for doc in docs])
+
+    def response(self, docs: Iterable[Dict], response: Optional[Response] = None) -> Response:
+        """`response` é o Response injetado no handler: seus cabeçalhos (ETag, X-Next-Cursor) são mantidos"""
+        headers = {}
+        if response is not None:
+            headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+        return Response(content=self.encode(docs), media_type="application/json", headers=headers)
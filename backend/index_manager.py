@@ -0,0 +1,121 @@
+"""
+Gerenciador de índices do MongoDB
+Declara os índices que as consultas do servidor usam, cria os que faltam na
+inicialização e aponta índices ausentes ou sem uso
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexSpec:
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    options: Dict = field(default_factory=dict)
+
+
+def order_number_index(reset_mode: str) -> IndexSpec:
+    """Índice único do número de pedido, conforme o modo de reinício da numeração"""
+    if reset_mode == "daily":
+        return IndexSpec(
+            "orders", [("order_day", ASCENDING), ("order_number", ASCENDING)], "order_day_number_unique",
+            {"unique": True, "partialFilterExpression": {"order_day": {"$exists": True}}},
+        )
+    return IndexSpec("orders", [("order_number", ASCENDING)], "order_number_unique", {"unique": True})
+
+
+def declared_indexes(order_number_reset: str = "never") -> List[IndexSpec]:
+    return [
+        # find_one({"id": ...}) em todas as coleções
+        IndexSpec("users", [("id", ASCENDING)], "id_unique", {"unique": True}),
+        IndexSpec("products", [("id", ASCENDING)], "id_unique", {"unique": True}),
+        IndexSpec("customers", [("id", ASCENDING)], "id_unique", {"unique": True}),
+        IndexSpec("orders", [("id", ASCENDING)], "id_unique", {"unique": True}),
+        IndexSpec("settings", [("id", ASCENDING)], "id_unique", {"unique": True}),
+        # Login e cadastro de usuários
+        IndexSpec("users", [("code", ASCENDING)], "code_unique", {"unique": True}),
+        # Catálogo filtrado por ativo/tipo
+        IndexSpec("products", [("active", ASCENDING), ("type", ASCENDING)], "active_type"),
+        # Lista de clientes ordenada por nome
+        IndexSpec("customers", [("name", ASCENDING)], "name"),
+        # Typeahead de clientes (prefixo de nome/telefone normalizados)
+        IndexSpec("customers", [("search_terms", ASCENDING)], "search_terms"),
+        # Numeração de pedidos
+        order_number_index(order_number_reset),
+        # Listagem paginada (created_at, id) e relatórios por data
+        IndexSpec("orders", [("created_at", DESCENDING), ("id", DESCENDING)], "created_at_id"),
+        # Cozinha: pedidos ativos por status
+        IndexSpec("orders", [("status", ASCENDING), ("created_at", DESCENDING)], "status_created_at"),
+        # Pedidos do atendente
+        IndexSpec("orders", [("attendant_code", ASCENDING), ("created_at", DESCENDING)], "attendant_created_at"),
+    ]
+
+
+class IndexManager:
+    def __init__(self, db, order_number_reset: str = "never"):
+        self.db = db
+        self.specs = declared_indexes(order_number_reset)
+        self.failed: List[IndexSpec] = []
+
+    async def ensure_indexes(self):
+        """Cria os índices declarados (create_index é idempotente)"""
+        self.failed = []
+        for spec in self.specs:
+            try:
+                await self.db[spec.collection].create_index(spec.keys, name=spec.name, **spec.options)
+            except OperationFailure as e:
+                # Ex.: dados duplicados impedindo índice único, ou opções conflitantes
+                self.failed.append(spec)
+                logger.error(f"Índice {spec.collection}.{spec.name} não criado: {e}")
+
+    async def _index_usage(self, collection: str) -> Dict[str, int]:
+        """Número de acessos de cada índice desde o último restart do mongod"""
+        try:
+            stats = await self.db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+        except (OperationFailure, NotImplementedError):
+            return {}
+        return {s["name"]: s.get("accesses", {}).get("ops", 0) for s in stats}
+
+    async def report(self) -> Dict:
+        """Compara os índices declarados com os existentes no banco"""
+        collections = sorted({spec.collection for spec in self.specs})
+        declared = {(spec.collection, spec.name) for spec in self.specs}
+        missing, unused, undeclared = [], [], []
+
+        for collection in collections:
+            existing = await self.db[collection].index_information()
+            usage = await self._index_usage(collection)
+
+            for spec in self.specs:
+                if spec.collection == collection and spec.name not in existing:
+                    missing.append(f"{collection}.{spec.name}")
+
+            for name in existing:
+                if name == "_id_":
+                    continue
+                if (collection, name) not in declared:
+                    undeclared.append(f"{collection}.{name}")
+                if usage and usage.get(name, 0) == 0:
+                    unused.append(f"{collection}.{name}")
+
+        return {"missing": missing, "unused": unused, "undeclared": undeclared}
+
+    async def bootstrap(self):
+        """Chamado no startup: cria índices e registra o que precisa de atenção"""
+        await self.ensure_indexes()
+        report = await self.report()
+        if report["missing"]:
+            logger.warning(f"Índices ausentes: {', '.join(report['missing'])}")
+        if report["undeclared"]:
+            logger.info(f"Índices não declarados no servidor: {', '.join(report['undeclared'])}")
+        if report["unused"]:
+            logger.info(f"Índices sem uso desde o último restart: {', '.join(report['unused'])}")
+        return report
@@ -5,16 +5,26 @@ Gerencia mensalidades e bloqueio de clientes inadimplentes
 
 import os
 import json
-import requests
+import asyncio
+import logging
+import httpx
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 LICENSE_FILE = Path(__file__).parent / ".license"
 LICENSE_SERVER = os.environ.get('LICENSE_SERVER_URL', 'https://japao-licencas.herokuapp.com')
 
+CHECK_INTERVAL = timedelta(hours=24)  # verificação online a cada 24h
+REQUEST_TIMEOUT = 10
+RETRY_INITIAL = 60                    # segundos até a 1ª nova tentativa quando o servidor não responde
+RETRY_MAX = 3600
+
+logger = logging.getLogger(__name__)
+
 class LicenseManager:
     def __init__(self):
         self.license_data = self._load_license()
+        self._refresher = None
     
     def _load_license(self):
         """Carrega dados da licença do arquivo local"""
@@ -31,22 +41,22 @@ class LicenseManager:
         with open(LICENSE_FILE, 'w') as f:
             json.dump(self.license_data, f)
     
-    def register_client(self, client_name, cnpj_cpf, phone, email):
+    async def register_client(self, client_name, cnpj_cpf, phone, email):
         """
         Registra um novo cliente no servidor de licenças
         """
         try:
-            response = requests.post(
-                f"{LICENSE_SERVER}/api/register",
-                json={
-                    "client_name": client_name,
-                    "cnpj_cpf": cnpj_cpf,
-                    "phone": phone,
-                    "email": email,
-                    "system": "Dona Guedes - Marmitaria"
-                },
-                timeout=10
-            )
+            async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as http:
+                response = await http.post(
+                    f"{LICENSE_SERVER}/api/register",
+                    json={
+                        "client_name": client_name,
+                        "cnpj_cpf": cnpj_cpf,
+                        "phone": phone,
+                        "email": email,
+                        "system": "Dona Guedes - Marmitaria"
+                    }
+                )
             
             if response.status_code == 200:
                 data = response.json()
@@ -76,7 +86,8 @@ class LicenseManager:
     
     def check_license(self):
         """
-        Verifica se a licença está ativa
+        Verifica se a licença está ativa (somente dados em memória, sem rede nem disco;
+        a verificação online roda em segundo plano - ver run_refresher)
         Retorna: (is_valid, message, days_remaining)
         """
         if not self.license_data:
@@ -90,37 +101,81 @@ class LicenseManager:
         if days_remaining < 0:
             return False, f"Licença EXPIRADA há {abs(days_remaining)} dias. Contate: (19) 99813-2220", days_remaining
         
-        # Tenta verificar online (a cada 24h)
-        last_check = datetime.fromisoformat(self.license_data.get('last_check', ''))
-        hours_since_check = (now - last_check).total_seconds() / 3600
-        
-        if hours_since_check > 24:
-            self._check_online()
-        
         # Aviso se está próximo do vencimento
         if days_remaining <= 5:
             return True, f"⚠️ Licença vence em {days_remaining} dias. Renove: (19) 99813-2220", days_remaining
         
         return True, "Licença ativa", days_remaining
     
-    def _check_online(self):
-        """Verifica status da licença no servidor"""
-        try:
-            response = requests.get(
+    async def _check_online(self):
+        """Verifica status da licença no servidor.
+
+        Grava o arquivo .license só quando status ou validade mudam; last_check
+        fica em memória. Levanta exceção se o servidor não responder.
+        """
+        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as http:
+            response = await http.get(
                 f"{LICENSE_SERVER}/api/check",
-                params={"license_key": self.license_data.get('license_key')},
-                timeout=10
+                params={"license_key": self.license_data.get('license_key')}
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.license_data['status'] = data['status']
-                self.license_data['expires_at'] = data['expires_at']
-                self.license_data['last_check'] = datetime.now(timezone.utc).isoformat()
+        
+        # Mesmo sem 200 (ex.: licença não encontrada) o servidor respondeu: só tenta de novo em 24h
+        self.license_data['last_check'] = datetime.now(timezone.utc).isoformat()
+        if response.status_code == 200:
+            data = response.json()
+            changed = (
+                self.license_data.get('status') != data['status']
+                or self.license_data.get('expires_at') != data['expires_at']
+            )
+            self.license_data['status'] = data['status']
+            self.license_data['expires_at'] = data['expires_at']
+            if changed:
                 self._save_license()
-        except:
-            # Se não conseguir conectar, usa cache local
-            pass
+    
+    def _next_check_in(self):
+        """Segundos até a próxima verificação online"""
+        try:
+            last_check = datetime.fromisoformat(self.license_data.get('last_check', ''))
+        except ValueError:
+            return 0
+        due = last_check + CHECK_INTERVAL - datetime.now(timezone.utc)
+        return max(0, due.total_seconds())
+    
+    async def run_refresher(self):
+        """Loop de verificação online: a cada 24h, com backoff quando o servidor não responde"""
+        retry_delay = RETRY_INITIAL
+        while True:
+            if not self.license_data:
+                # Sem licença local: nada a verificar até register_client
+                await asyncio.sleep(RETRY_MAX)
+                continue
+            
+            wait = self._next_check_in()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            
+            try:
+                await self._check_online()
+                retry_delay = RETRY_INITIAL
+            except Exception as e:
+                # Se não conseguir conectar, usa cache local e tenta de novo mais tarde
+                logger.warning(f"Verificação de licença falhou, nova tentativa em {retry_delay}s: {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, RETRY_MAX)
+    
+    def start_refresher(self):
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self.run_refresher())
+    
+    async def stop_refresher(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
     
     def get_client_info(self):
         """Retorna informações do cliente"""
@@ -0,0 +1,235 @@
+"""
+Métricas no formato texto do Prometheus (GET /metrics), sem dependências
+Usado pelos dois backends (o offline importa os módulos desta pasta):
+- MetricsMiddleware: latência por rota (o template, ex.: /api/orders/{order_id})
+- TimedConnection: tempo de cada comando SQL do sqlite3 (backend offline)
+- mongo_metrics.MongoCommandMetrics: tempo de cada comando do MongoDB (online)
+- print_queue / print_to_windows: tempo de envio e falhas da impressora
+Cada observação é uma busca binária nos buckets e alguns incrementos sob um
+lock (os handlers síncronos do offline rodam em várias threads).
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<sem rota>"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in sorted(items):
+            lines.append(f"{self.name}{_labels_text(self.labelnames, labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [contagem por bucket (não acumulada; a última posição é +Inf), soma]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(items):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound:g}"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, labels, le)} {cumulative}")
+            label_text = _labels_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {total:.6f}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota", ("method", "route", "status")))
+db_operation_duration = registry.register(Histogram(
+    "db_operation_duration_seconds", "Tempo dos comandos no banco", ("backend", "operation", "target", "result")))
+printer_send_duration = registry.register(Histogram(
+    "printer_send_duration_seconds", "Tempo de envio de um job à impressora (por tentativa)",
+    ("printer", "result"), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)))
+printer_failures = registry.register(Counter(
+    "printer_failures_total", "Falhas ao enviar para a impressora", ("printer",)))
+printer_jobs = registry.register(Counter(
+    "printer_jobs_total", "Jobs de impressão finalizados", ("printer", "status")))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ===== HTTP =====
+class MetricsMiddleware:
+    """Middleware ASGI puro (sem BaseHTTPMiddleware, que bufferiza e cria tarefas).
+
+    A rota só é conhecida depois que o roteador do FastAPI casa a requisição:
+    ele grava scope["route"], e é dali que sai o template usado como label.
+    Streams (SSE, exportação) são medidos até o fim da resposta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], path, status[0])
+
+
+# ===== SQLite =====
+_SQL_TARGET = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|ON)\s+(?:IF\s+NOT\s+EXISTS\s+)?([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=512)
+def sql_labels(sql: str) -> Tuple[str, str]:
+    """(operação, tabela) de um comando SQL; os comandos são quase sempre os mesmos textos"""
+    words = sql.split(None, 1)
+    operation = words[0].upper() if words else "?"
+    match = _SQL_TARGET.search(sql)
+    return operation, match.group(1) if match else ""
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Mede execute/executemany (em SELECT, a leitura das linhas no fetch fica de fora)"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        result = "ok"
+        try:
+            return super().execute(sql, parameters)
+        except sqlite3.Error:
+            result = "error"
+            raise
+        finally:
+            db_operation_duration.observe(time.perf_counter() - start, "sqlite", *sql_labels(sql), result)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        result = "ok"
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        except sqlite3.Error:
+            result = "error"
+            raise
+        finally:
+            db_operation_duration.observe(time.perf_counter() - start, "sqlite", *sql_labels(sql), result)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Use como sqlite3.connect(path, factory=TimedConnection)"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        result = "ok"
+        try:
+            super().commit()
+        except sqlite3.Error:
+            result = "error"
+            raise
+        finally:
+            db_operation_duration.observe(time.perf_counter() - start, "sqlite", "COMMIT", "", result)
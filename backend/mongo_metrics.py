@@ -0,0 +1,33 @@
+"""
+Tempo dos comandos do MongoDB para o /metrics (ver metrics.py)
+O pymongo chama o listener em todo comando, inclusive os do Motor; a duração
+vem do próprio driver (duration_micros), sem envolver cada chamada em código.
+"""
+
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+from metrics import db_operation_duration
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        # (conexão, request_id) -> coleção do comando em andamento
+        self._targets: Dict[Tuple, str] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if not isinstance(target, str):
+            target = event.command.get("collection", "")    # getMore traz o id do cursor no lugar
+        self._targets[(event.connection_id, event.request_id)] = target
+
+    def _observe(self, event, result: str):
+        target = self._targets.pop((event.connection_id, event.request_id), "")
+        db_operation_duration.observe(event.duration_micros / 1e6, "mongodb", event.command_name, target, result)
+
+    def succeeded(self, event):
+        self._observe(event, "ok")
+
+    def failed(self, event):
+        self._observe(event, "error")
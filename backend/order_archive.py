@@ -0,0 +1,132 @@
+"""
+Arquivo de pedidos antigos (armazenamento quente/frio)
+Pedidos finalizados há mais de ORDER_ARCHIVE_DAYS dias saem da coleção orders
+e vão para uma coleção por mês (orders_archive_AAAA_MM). A coleção orders fica
+só com a operação corrente: listagens, cozinha e contadores não pagam pelo
+histórico. Relatórios e exportações continuam enxergando o arquivo (ver
+collections_for_range).
+"""
+
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from date_migration import parse_stored_date
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_DAYS', '30'))
+ARCHIVE_INTERVAL = 3600          # segundos entre rodadas
+ARCHIVE_STATUSES = ["completed", "delivered"]
+ARCHIVE_BATCH = 500
+ARCHIVE_PREFIX = "orders_archive_"
+_ARCHIVE_NAME = re.compile(r"^orders_archive_(\d{4})_(\d{2})$")
+
+
+def archive_collection_name(created_at) -> Optional[str]:
+    if not isinstance(created_at, datetime):
+        created_at = parse_stored_date(created_at)
+        if created_at is None:
+            return None
+    return f"{ARCHIVE_PREFIX}{created_at.year:04d}_{created_at.month:02d}"
+
+
+class OrderArchive:
+    def __init__(self, db, date_range):
+        """`date_range(start, end)` monta o filtro de created_at (ver DateMigration.created_at_range)"""
+        self.db = db
+        self.date_range = date_range
+        self.months: List[str] = []      # coleções de arquivo existentes, em ordem cronológica
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh_months(self):
+        names = await self.db.list_collection_names()
+        self.months = sorted(name for name in names if _ARCHIVE_NAME.match(name))
+
+    def collections_for_range(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        """Coleções de arquivo com meses dentro de [start, end), em ordem cronológica"""
+        first = archive_collection_name(start) if start else None
+        last = archive_collection_name(end - timedelta(microseconds=1)) if end else None
+        return [
+            name for name in self.months
+            if (first is None or name >= first) and (last is None or name <= last)
+        ]
+
+    async def find_order(self, order_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
+        """Procura um pedido arquivado, do mês mais recente para o mais antigo"""
+        for name in reversed(self.months):
+            order = await self.db[name].find_one({"id": order_id}, projection)
+            if order:
+                return order
+        return None
+
+    async def _ensure_indexes(self, name: str):
+        await self.db[name].create_index([("id", ASCENDING)], name="id_unique", unique=True)
+        await self.db[name].create_index([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id")
+
+    async def archive_once(self, now: Optional[datetime] = None) -> int:
+        """Move os pedidos finalizados mais antigos que o limite; retorna quantos foram movidos"""
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=ARCHIVE_AFTER_DAYS)
+        query = {
+            "status": {"$in": ARCHIVE_STATUSES},
+            **self.date_range(datetime.min.replace(tzinfo=timezone.utc), cutoff),
+        }
+        moved = 0
+        while True:
+            batch = await self.db.orders.find(query, {"_id": 0}).limit(ARCHIVE_BATCH).to_list(ARCHIVE_BATCH)
+            if not batch:
+                break
+
+            by_month: Dict[str, List[Dict]] = {}
+            for order in batch:
+                name = archive_collection_name(order.get("created_at"))
+                if name:
+                    by_month.setdefault(name, []).append(order)
+            if not by_month:
+                break
+
+            for name, orders in by_month.items():
+                if name not in self.months:
+                    await self._ensure_indexes(name)
+                    self.months = sorted([*self.months, name])
+                # Cópia idempotente: se cair entre a cópia e a remoção, a próxima rodada refaz sem duplicar
+                await self.db[name].bulk_write(
+                    [ReplaceOne({"id": o["id"]}, o, upsert=True) for o in orders], ordered=False
+                )
+                result = await self.db.orders.delete_many({
+                    "id": {"$in": [o["id"] for o in orders]},
+                    "status": {"$in": ARCHIVE_STATUSES},
+                })
+                moved += result.deleted_count
+            await asyncio.sleep(0)
+        if moved:
+            logger.info(f"{moved} pedidos movidos para o arquivo")
+        return moved
+
+    async def run(self):
+        while True:
+            try:
+                await self.archive_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Arquivamento de pedidos falhou: {e}")
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+
+    def start(self):
+        if self._task is None and ARCHIVE_AFTER_DAYS > 0:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,87 @@
+"""
+Eventos de pedidos em tempo real
+Pub/sub em memória que alimenta o stream da cozinha (/api/orders/stream).
+Os eventos vêm dos próprios handlers (create_order, update_order_status) ou,
+com ORDER_EVENTS_SOURCE=changestream, de um change stream do MongoDB -
+necessário quando há mais de um processo servindo a API.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Eventos pendentes por assinante antes de forçar um novo snapshot
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class OrderEventBus:
+    def __init__(self):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, order: Dict):
+        """Entrega o evento a todos os assinantes sem bloquear o handler"""
+        event = {"type": event_type, "order": order}
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Assinante lento: descarta o atraso e pede que ele recarregue o snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ===== Change streams (opcional) =====
+    def start_change_stream(self, collection):
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(collection))
+
+    async def stop_change_stream(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self, collection):
+        """Republica inserts/updates da coleção orders (requer replica set)"""
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+        resume_token = None
+        while True:
+            try:
+                async with collection.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        order = change.get("fullDocument")
+                        if not order:
+                            continue
+                        order.pop("_id", None)
+                        event_type = "order_created" if change["operationType"] == "insert" else "order_updated"
+                        self.publish(event_type, order)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Change stream de pedidos interrompido: {e}")
+                await asyncio.sleep(5)
+
+
+# Instância global
+order_events = OrderEventBus()
@@ -0,0 +1,127 @@
+"""
+Exportação de pedidos em NDJSON ou CSV (contabilidade)
+Formatação compartilhada pelo servidor online (server.py) e offline
+(desktop/server_offline.py). Os servidores leem os pedidos do banco em lotes
+e passam cada um por aqui, linha a linha, para um StreamingResponse: a memória
+usada não depende do período exportado.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator
+
+from receipt_engine import EXTRA_SECTIONS, format_proteins
+
+EXPORT_BATCH = 500           # pedidos por lote lido do banco
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+CSV_COLUMNS = [
+    "order_number", "created_at", "status", "customer_name", "is_company_order",
+    "order_type", "delivery_address", "marmitas", "items",
+    *[field for field, _ in EXTRA_SECTIONS],
+    "observations", "total_price", "payment_method", "amount_paid", "change_amount",
+    "attendant_code", "attendant_name", "printed", "id",
+]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def ndjson_line(order: Dict) -> str:
+    return json.dumps(order, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def _items_summary(items) -> str:
+    """'M: Frango + Bife (Arroz, Feijao) | G: Frango' - uma célula por pedido"""
+    parts = []
+    for item in items or []:
+        text = f"{item.get('size', '')}: {format_proteins(item)}"
+        if item.get('employee_name'):
+            text = f"{item['employee_name']} - {text}"
+        if item.get('accompaniments'):
+            text += f" ({', '.join(item['accompaniments'])})"
+        parts.append(text)
+    return " | ".join(parts)
+
+
+def csv_row(order: Dict) -> list:
+    row = []
+    for column in CSV_COLUMNS:
+        if column == "marmitas":
+            value = len(order.get('items') or [])
+        elif column == "items":
+            value = _items_summary(order.get('items'))
+        else:
+            value = order.get(column)
+            if isinstance(value, list):
+                value = ", ".join(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+        row.append("" if value is None else value)
+    return row
+
+
+class OrderExportEncoder:
+    """Converte pedidos em texto NDJSON ou CSV, um lote por vez"""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.media_type = EXPORT_FORMATS[fmt]
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def header(self) -> str:
+        if self.fmt != "csv":
+            return ""
+        self._writer.writerow(CSV_COLUMNS)
+        # BOM para o Excel abrir os acentos corretamente
+        return "\ufeff" + self._flush()
+
+    def encode(self, orders: Iterable[Dict]) -> str:
+        if self.fmt != "csv":
+            return "".join(ndjson_line(order) for order in orders)
+        self._writer.writerows(csv_row(order) for order in orders)
+        return self._flush()
+
+    def _flush(self) -> str:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text
+
+
+def iter_export(batches: Iterable[Iterable[Dict]], encoder: OrderExportEncoder) -> Iterator[str]:
+    """Um pedaço de resposta por lote (backend síncrono / SQLite)"""
+    header = encoder.header()
+    if header:
+        yield header
+    for batch in batches:
+        yield encoder.encode(batch)
+
+
+async def aiter_export(cursor, encoder: OrderExportEncoder):
+    """Um pedaço de resposta a cada EXPORT_BATCH pedidos de um cursor assíncrono (Motor)"""
+    header = encoder.header()
+    if header:
+        yield header
+    batch = []
+    async for order in cursor:
+        batch.append(order)
+        if len(batch) >= EXPORT_BATCH:
+            yield encoder.encode(batch)
+            batch = []
+    if batch:
+        yield encoder.encode(batch)
+
+
+def export_filename(fmt: str, date_from=None, date_to=None) -> str:
+    period = "_".join(p for p in (date_from, date_to) if p) or "todos"
+    return f"pedidos_{period}.{fmt}"
@@ -0,0 +1,206 @@
+"""
+Fila de impressão térmica (ESC/POS via TCP, porta 9100)
+Os handlers só enfileiram o cupom e respondem na hora; um worker por impressora
+mantém a conexão aberta, reconecta com backoff e tenta de novo quando a
+impressora está lenta ou fora do ar. O status de cada job fica consultável.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import printer_failures, printer_jobs, printer_send_duration
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 5          # segundos para abrir a conexão
+WRITE_TIMEOUT = 10           # segundos para a impressora aceitar os bytes
+IDLE_DISCONNECT = 30         # fecha a conexão ociosa (libera a impressora para outros PCs)
+MAX_ATTEMPTS = 5             # tentativas por job antes de marcar como falho
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30
+JOB_HISTORY = 500            # jobs finalizados mantidos para consulta
+
+
+class PrintJob:
+    """Um ou mais cupons enviados em sequência pela mesma conexão.
+
+    `parts` tem os bytes ESC/POS de cada cupom (cada um já termina com corte);
+    `printed` conta quantos já foram aceitos pela impressora, e uma nova tentativa
+    continua a partir daí sem repetir os cupons já impressos.
+    """
+
+    def __init__(self, printer: Tuple[str, int], parts: List[bytes], order_id: Optional[str] = None,
+                 label: Optional[str] = None,
+                 on_done: Optional[Callable[["PrintJob"], Awaitable[None]]] = None):
+        self.id = str(uuid.uuid4())
+        self.printer = printer
+        self.parts = parts
+        self.printed = 0
+        self.order_id = order_id
+        self.label = label
+        self.on_done = on_done
+        self.status = "queued"  # queued, printing, done, failed
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "label": self.label,
+            "printer": f"{self.printer[0]}:{self.printer[1]}",
+            "status": self.status,
+            "printed": self.printed,
+            "total": len(self.parts),
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class PrinterWorker:
+    """Processa em ordem os jobs de uma impressora sobre uma conexão persistente"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._backoff = BACKOFF_INITIAL
+        self._idle_timer: Optional[asyncio.TimerHandle] = None
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if self.queue.empty() and self._writer is not None:
+                self._idle_timer = loop.call_later(IDLE_DISCONNECT, self._close_idle)
+            job = await self.queue.get()
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            await self._process(job)
+
+    def _close_idle(self):
+        self._idle_timer = None
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+
+    async def _process(self, job: PrintJob):
+        job.status = "printing"
+        printer = f"{self.host}:{self.port}"
+        while True:
+            job.attempts += 1
+            start = time.perf_counter()
+            try:
+                await self._send(job)
+                printer_send_duration.observe(time.perf_counter() - start, printer, "ok")
+                job.status = "done"
+                job.error = None
+                self._backoff = BACKOFF_INITIAL
+                break
+            except (OSError, asyncio.TimeoutError) as e:
+                printer_send_duration.observe(time.perf_counter() - start, printer, "error")
+                printer_failures.inc(printer)
+                await self._disconnect()
+                job.error = str(e) or e.__class__.__name__
+                logger.warning(f"Impressora {self.host}:{self.port} falhou (tentativa {job.attempts}): {job.error}")
+                if job.attempts >= MAX_ATTEMPTS:
+                    job.status = "failed"
+                    break
+                await asyncio.sleep(self._backoff)
+                self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+
+        job.finished_at = datetime.now(timezone.utc)
+        printer_jobs.inc(printer, job.status)
+        if job.on_done:
+            try:
+                await job.on_done(job)
+            except Exception as e:
+                logger.error(f"Erro no callback do job de impressão {job.id}: {e}")
+
+    async def _send(self, job: PrintJob):
+        await self._connect()
+        while job.printed < len(job.parts):
+            self._writer.write(job.parts[job.printed])
+            await asyncio.wait_for(self._writer.drain(), timeout=WRITE_TIMEOUT)
+            job.printed += 1
+
+    async def _connect(self):
+        # A impressora pode ter encerrado a conexão ociosa do lado dela
+        if self._writer is not None and (self._writer.is_closing() or self._reader.at_eof()):
+            await self._disconnect()
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=CONNECT_TIMEOUT
+            )
+
+    async def _disconnect(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    async def stop(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        await self._disconnect()
+
+
+class PrintQueue:
+    def __init__(self):
+        self.jobs: "OrderedDict[str, PrintJob]" = OrderedDict()
+        self.workers: Dict[Tuple[str, int], PrinterWorker] = {}
+
+    def submit(self, host: str, port: int, parts: List[bytes], order_id: Optional[str] = None,
+               label: Optional[str] = None,
+               on_done: Optional[Callable[[PrintJob], Awaitable[None]]] = None) -> PrintJob:
+        """Enfileira um ou mais cupons; deve ser chamado de dentro do event loop"""
+        printer = (host, port)
+        job = PrintJob(printer, parts, order_id=order_id, label=label, on_done=on_done)
+        self.jobs[job.id] = job
+        self._trim_history()
+
+        worker = self.workers.get(printer)
+        if worker is None:
+            worker = self.workers[printer] = PrinterWorker(host, port)
+        worker.queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[PrintJob]:
+        return self.jobs.get(job_id)
+
+    def list(self, order_id: Optional[str] = None) -> List[PrintJob]:
+        return [job for job in self.jobs.values() if order_id is None or job.order_id == order_id]
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self.jobs[job_id]
+
+    async def shutdown(self):
+        for worker in self.workers.values():
+            await worker.stop()
+        self.workers.clear()
+
+
+# Instância global
+print_queue = PrintQueue()
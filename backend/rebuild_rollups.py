@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Recalcula a coleção daily_rollups a partir dos pedidos (inclui o arquivo)
+Sem datas, refaz todo o histórico e marca os rollups como prontos para os
+relatórios. Rode com a loja fechada para não perder pedidos do dia corrente.
+
+Execute (na pasta backend): python rebuild_rollups.py [--start AAAA-MM-DD] [--end AAAA-MM-DD]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+
+from server import client, daily_rollups
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", type=parse_day)
+    parser.add_argument("--end", type=parse_day)
+    args = parser.parse_args()
+
+    try:
+        days = await daily_rollups.rebuild(args.start, args.end)
+        print(f"daily_rollups recalculado: {days} dias com pedidos")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
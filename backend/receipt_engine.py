@@ -0,0 +1,187 @@
+"""
+Motor de cupons compartilhado pelo servidor online (server.py) e offline
+(desktop/server_offline.py)
+
+O layout de cada loja é compilado uma vez por versão das configurações:
+cabeçalhos, separadores e rodapés ficam prontos em texto e em bytes ESC/POS,
+e cada cupom só monta o miolo do pedido.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+WIDTH = 40
+DOUBLE_LINE = "=" * WIDTH
+SINGLE_LINE = "-" * WIDTH
+FEED_AFTER = "\n\n\n"
+
+# ESC/POS: alinhamento à esquerda, tabela PC850 (acentos), avanço de 6 linhas + corte total
+ESCPOS_INIT = b"\x1ba\x00" + b"\x1bt\x02"
+ESCPOS_CUT = b"\x1bd\x06" + b"\x1dV\x00"
+ESCPOS_ENCODING = "cp850"
+
+EXTRA_SECTIONS = (
+    ("salads", "Saladas"),
+    ("beverages", "Bebidas"),
+    ("coffees", "Cafes"),
+    ("snacks", "Lanches"),
+    ("desserts", "Sobremesas"),
+    ("others", "Outros"),
+)
+
+
+def encode_escpos(text: str) -> bytes:
+    return text.encode(ESCPOS_ENCODING, errors="replace")
+
+
+def format_proteins(item: Dict) -> str:
+    # Suporta tanto 'protein' (formato antigo) quanto 'proteins'
+    proteins = item.get('proteins') or [item.get('protein') or '']
+    if isinstance(proteins, list):
+        return ' + '.join(p for p in proteins if p)
+    return proteins
+
+
+def format_created_at(value) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()[:19]
+    return (value or '')[:19]
+
+
+class ReceiptLayout:
+    """Blocos fixos de uma loja, prontos para texto e ESC/POS"""
+
+    def __init__(self, store_name: str, store_address: str):
+        store_name = store_name or ""
+        store_address = store_address or ""
+
+        self.order_header = "\n".join([
+            DOUBLE_LINE,
+            store_name.center(WIDTH),
+            store_address.center(WIDTH),
+            DOUBLE_LINE,
+        ])
+        self.employee_header = "\n".join([
+            DOUBLE_LINE,
+            store_name.center(WIDTH),
+            DOUBLE_LINE,
+        ])
+        self.order_footer = "\n".join([
+            DOUBLE_LINE,
+            "     Obrigado pela preferencia!",
+            DOUBLE_LINE,
+            FEED_AFTER,
+        ])
+        self.employee_footer = "\n".join([DOUBLE_LINE, FEED_AFTER])
+
+        self._order_header_bytes = ESCPOS_INIT + encode_escpos(self.order_header + "\n")
+        self._employee_header_bytes = ESCPOS_INIT + encode_escpos(self.employee_header + "\n")
+        self._order_footer_bytes = encode_escpos(self.order_footer + "\n") + ESCPOS_CUT
+        self._employee_footer_bytes = encode_escpos(self.employee_footer + "\n") + ESCPOS_CUT
+
+    # ===== Miolo =====
+    @staticmethod
+    def _order_body(order: Dict) -> str:
+        lines = [
+            f"Pedido: #{order['order_number']}",
+            f"Cliente: {order['customer_name']}",
+            f"Tipo: {order['order_type']}",
+        ]
+        if order['order_type'] == 'ENTREGA' and order.get('delivery_address'):
+            lines.append(f"Endereco: {order['delivery_address']}")
+        lines.append(SINGLE_LINE)
+
+        # Print each marmita
+        for idx, item in enumerate(order.get('items') or [], 1):
+            lines.append(f"\nMarmita {idx} ({item['size']}):")
+            if item.get('employee_name'):
+                lines.append(f"  Para: {item['employee_name']}")
+            lines.append(f"  Mistura: {format_proteins(item)}")
+            if item.get('accompaniments'):
+                lines.append(f"  Acomp.: {', '.join(item['accompaniments'])}")
+        lines.append(SINGLE_LINE)
+
+        for field, label in EXTRA_SECTIONS:
+            values = order.get(field)
+            if values:
+                lines.append(f"{label}: {', '.join(values)}")
+
+        if order.get('observations'):
+            lines.append(f"Obs: {order['observations']}")
+
+        lines.append(SINGLE_LINE)
+        lines.append(f"TOTAL: R$ {order['total_price']:.2f}")
+
+        # Pagamento
+        payment_method = order.get('payment_method') or 'DINHEIRO'
+        lines.append(f"Pagamento: {payment_method}")
+        if payment_method == "DINHEIRO":
+            amount_paid = order.get('amount_paid') or 0
+            if amount_paid > 0:
+                lines.append(f"Valor Recebido: R$ {amount_paid:.2f}")
+                lines.append(f"TROCO: R$ {(order.get('change_amount') or 0):.2f}")
+
+        lines.append(SINGLE_LINE)
+        lines.append(f"Atendente: {order['attendant_name']}")
+        lines.append(f"Data: {format_created_at(order.get('created_at'))}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _employee_body(order: Dict, item: Dict, employee_name: str) -> str:
+        lines = [
+            f"Pedido: #{order['order_number']}",
+            f"Empresa: {order['customer_name']}",
+            f"\n>>> PARA: {employee_name} <<<\n",
+            SINGLE_LINE,
+            f"Tamanho: {item['size']}",
+            f"Mistura: {format_proteins(item)}",
+        ]
+        if item.get('accompaniments'):
+            lines.append("Acompanhamentos:")
+            lines.extend(f"  - {acc}" for acc in item['accompaniments'])
+        return "\n".join(lines)
+
+    # ===== Texto =====
+    def order_text(self, order: Dict) -> str:
+        """Cupom completo do pedido"""
+        return "\n".join([self.order_header, self._order_body(order), self.order_footer])
+
+    def employee_text(self, order: Dict, item: Dict, employee_name: str) -> str:
+        """Cupom individual de um funcionário (pedidos de empresa)"""
+        return "\n".join([self.employee_header, self._employee_body(order, item, employee_name), self.employee_footer])
+
+    # ===== ESC/POS =====
+    def order_escpos(self, order: Dict) -> bytes:
+        return self._order_header_bytes + encode_escpos(self._order_body(order) + "\n") + self._order_footer_bytes
+
+    def employee_escpos(self, order: Dict, item: Dict, employee_name: str) -> bytes:
+        return (self._employee_header_bytes
+                + encode_escpos(self._employee_body(order, item, employee_name) + "\n")
+                + self._employee_footer_bytes)
+
+    def employee_receipts(self, order: Dict) -> List[Tuple[Dict, str]]:
+        """(item, nome do funcionário) para cada marmita de um pedido de empresa"""
+        return [
+            (item, item.get('employee_name') or f"Funcionário {idx}")
+            for idx, item in enumerate(order.get('items') or [], 1)
+        ]
+
+
+class ReceiptEngine:
+    """Guarda o layout compilado; recompila só quando nome/endereço da loja mudam"""
+
+    def __init__(self):
+        self._key: Optional[Tuple[str, str]] = None
+        self._layout: Optional[ReceiptLayout] = None
+
+    def layout(self, store_name: str, store_address: str) -> ReceiptLayout:
+        key = (store_name, store_address)
+        layout = self._layout
+        if layout is None or self._key != key:
+            layout = ReceiptLayout(store_name, store_address)
+            self._key, self._layout = key, layout
+        return layout
+
+
+# Instância global
+receipt_engine = ReceiptEngine()
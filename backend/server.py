@@ -1,26 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
-from fastapi.responses import Response
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import hashlib
-from escpos.printer import Network, Dummy
+import json
+import base64
+import orjson
 import io
 from license_manager import license_manager
+from index_manager import IndexManager
+from order_events import order_events
+from collection_versions import collection_versions
+from print_queue import print_queue
+from receipt_engine import receipt_engine
+from order_export import EXPORT_BATCH, EXPORT_FORMATS, OrderExportEncoder, aiter_export, export_filename
+from fast_json import ListEncoder
+from date_migration import DateMigration, parse_stored_date
+from order_archive import OrderArchive
+from daily_rollups import DailyRollups
+from customer_search import SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX, prefix_range, search_fields, search_key
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from mongo_metrics import MongoCommandMetrics
 import tempfile
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: datas nativas voltam do banco como datetime em UTC
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
@@ -168,10 +187,83 @@ class SettingsUpdate(BaseModel):
     printer_ip: Optional[str] = None
     printer_port: Optional[int] = None
 
+# Serialização das listagens (ver fast_json.py)
+users_json = ListEncoder(User)
+products_json = ListEncoder(Product)
+customers_json = ListEncoder(Customer)
+orders_json = ListEncoder(Order)
+
 # ===== AUTH HELPERS =====
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
+# ===== SETTINGS CACHE =====
+class SettingsCache:
+    """Configurações em memória; update_settings invalida (write-through)"""
+    def __init__(self):
+        self._settings: Optional[Settings] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Settings:
+        if self._settings is not None:
+            return self._settings
+        async with self._lock:
+            if self._settings is None:
+                self._settings = await self._load()
+            return self._settings
+
+    def invalidate(self):
+        self._settings = None
+
+    async def _load(self) -> Settings:
+        settings_dict = await db.settings.find_one({"id": "settings"}, {"_id": 0})
+        if not settings_dict:
+            # Create default settings
+            settings = Settings()
+            await db.settings.insert_one(settings.model_dump())
+            return settings
+        
+        # updated_at pode ainda estar em texto (ver date_migration.py); o modelo aceita os dois
+        return Settings(**settings_dict)
+
+settings_cache = SettingsCache()
+
+# ===== ORDER NUMBERS =====
+# "never": numeração contínua; "daily": recomeça em 1 a cada dia (UTC)
+ORDER_NUMBER_RESET = os.environ.get('ORDER_NUMBER_RESET', 'never').lower()
+
+def order_counter_id(when: datetime) -> str:
+    if ORDER_NUMBER_RESET == "daily":
+        return f"order_number:{when.date().isoformat()}"
+    return "order_number"
+
+async def next_order_number(when: datetime) -> int:
+    """Reserva o próximo número de pedido com um único $inc atômico"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": order_counter_id(when)},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+async def seed_order_counter():
+    """Garante que o contador nunca fique abaixo do maior número já gravado"""
+    now = datetime.now(timezone.utc)
+    query = {"order_day": now.date().isoformat()} if ORDER_NUMBER_RESET == "daily" else {}
+    last_order = await db.orders.find_one(query, {"order_number": 1}, sort=[("order_number", -1)])
+    last_number = last_order['order_number'] if last_order else 0
+    await db.counters.update_one(
+        {"_id": order_counter_id(now)},
+        {"$max": {"seq": last_number}},
+        upsert=True,
+    )
+
+index_manager = IndexManager(db, ORDER_NUMBER_RESET)
+date_migration = DateMigration(db)
+order_archive = OrderArchive(db, date_migration.created_at_range)
+daily_rollups = DailyRollups(db, date_migration.created_at_range, order_archive)
+
 # ===== ROUTES =====
 @api_router.get("/")
 async def root():
@@ -205,7 +297,7 @@ class LicenseActivation(BaseModel):
 
 @api_router.post("/license/activate")
 async def activate_license(data: LicenseActivation):
-    success, message = license_manager.register_client(
+    success, message = await license_manager.register_client(
         data.client_name,
         data.cnpj_cpf,
         data.phone,
@@ -217,6 +309,16 @@ async def activate_license(data: LicenseActivation):
     else:
         raise HTTPException(status_code=400, detail=message)
 
+@api_router.get("/system/indexes")
+async def get_index_report():
+    """Índices ausentes, sem uso ou não declarados"""
+    return await index_manager.report()
+
+@api_router.get("/system/migrations")
+async def get_migration_status():
+    """Andamento da conversão de datas em texto para datetime nativo"""
+    return await date_migration.status()
+
 @api_router.post("/auth/login")
 async def login(req: LoginRequest):
     user_dict = await db.users.find_one({"code": req.code, "active": True}, {"_id": 0})
@@ -237,10 +339,7 @@ async def login(req: LoginRequest):
 @api_router.get("/users", response_model=List[User])
 async def get_users():
     users = await db.users.find({"active": True}, {"_id": 0, "password": 0}).to_list(1000)
-    for u in users:
-        if isinstance(u['created_at'], str):
-            u['created_at'] = datetime.fromisoformat(u['created_at'])
-    return users
+    return users_json.response(users)
 
 @api_router.post("/users", response_model=User)
 async def create_user(user_input: UserCreate):
@@ -255,7 +354,6 @@ async def create_user(user_input: UserCreate):
     
     user_obj = User(**user_dict)
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.users.insert_one(doc)
     return user_obj
@@ -268,22 +366,22 @@ async def delete_user(user_id: str):
     return {"message": "Usuário removido"}
 
 @api_router.get("/products", response_model=List[Product])
-async def get_products(active_only: bool = False):
+async def get_products(request: Request, response: Response, active_only: bool = False):
+    not_modified = collection_versions.check(request, response, "products", "active" if active_only else "all")
+    if not_modified:
+        return not_modified
     query = {"active": True} if active_only else {}
     products = await db.products.find(query, {"_id": 0}).to_list(1000)
-    for p in products:
-        if isinstance(p['created_at'], str):
-            p['created_at'] = datetime.fromisoformat(p['created_at'])
-    return products
+    return products_json.response(products, response)
 
 @api_router.post("/products", response_model=Product)
 async def create_product(product_input: ProductCreate):
     product_dict = product_input.model_dump()
     product_obj = Product(**product_dict)
     doc = product_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.products.insert_one(doc)
+    collection_versions.bump("products")
     return product_obj
 
 @api_router.patch("/products/{product_id}")
@@ -295,6 +393,7 @@ async def update_product(product_id: str, update: ProductUpdate):
     result = await db.products.update_one({"id": product_id}, {"$set": update_dict})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    collection_versions.bump("products")
     return {"message": "Produto atualizado"}
 
 @api_router.delete("/products/{product_id}")
@@ -302,6 +401,7 @@ async def delete_product(product_id: str):
     result = await db.products.update_one({"id": product_id}, {"$set": {"active": False}})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    collection_versions.bump("products")
     return {"message": "Produto removido"}
 
 @api_router.delete("/products/{product_id}/permanent")
@@ -309,24 +409,51 @@ async def delete_product_permanent(product_id: str):
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
+    collection_versions.bump("products")
     return {"message": "Produto excluído permanentemente"}
 
 @api_router.get("/customers", response_model=List[Customer])
-async def get_customers():
-    customers = await db.customers.find({}, {"_id": 0}).sort("name", 1).to_list(1000)
-    for c in customers:
-        if isinstance(c['created_at'], str):
-            c['created_at'] = datetime.fromisoformat(c['created_at'])
-    return customers
+async def get_customers(request: Request, response: Response):
+    not_modified = collection_versions.check(request, response, "customers")
+    if not_modified:
+        return not_modified
+    customers = await db.customers.find({}, {"_id": 0, "search_terms": 0}).sort("name", 1).to_list(1000)
+    return customers_json.response(customers, response)
+
+@api_router.get("/customers/search", response_model=List[Customer])
+async def search_customers(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+):
+    """Typeahead: clientes cujo nome (qualquer palavra) ou telefone começa com `q`"""
+    key = search_key(q)
+    if not key:
+        return []
+    start, end = prefix_range(key)
+    # Ordena antes do limit: os `limit` primeiros por nome entre todos os que casam, sempre os
+    # mesmos. O hint fixa o índice search_terms (só o trecho do prefixo é lido; o sort por nome
+    # é um top-k em memória); sem ele o planner pode preferir o índice name e varrer a coleção.
+    customers = await db.customers.find(
+        # $elemMatch: os dois limites valem para o mesmo termo (senão cada um casaria um termo diferente)
+        {"search_terms": {"$elemMatch": {"$gte": start, "$lt": end}}},
+        {"_id": 0, "search_terms": 0},
+    ).sort([("name", 1), ("id", 1)]).hint("search_terms").limit(limit).to_list(limit)
+    return customers_json.response(customers)
+
+async def backfill_customer_search_terms():
+    """Grava search_terms em clientes cadastrados antes da busca indexada"""
+    async for c in db.customers.find({"search_terms": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1, "phone": 1}):
+        await db.customers.update_one({"id": c['id']}, {"$set": search_fields(c)})
 
 @api_router.post("/customers", response_model=Customer)
 async def create_customer(customer_input: CustomerCreate):
     customer_dict = customer_input.model_dump()
     customer_obj = Customer(**customer_dict)
     doc = customer_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc.update(search_fields(doc))
     
     await db.customers.insert_one(doc)
+    collection_versions.bump("customers")
     return customer_obj
 
 @api_router.patch("/customers/{customer_id}")
@@ -335,9 +462,15 @@ async def update_customer(customer_id: str, update: CustomerUpdate):
     if not update_dict:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
     
+    if 'name' in update_dict or 'phone' in update_dict:
+        current = await db.customers.find_one({"id": customer_id}, {"_id": 0, "name": 1, "phone": 1})
+        if current:
+            update_dict.update(search_fields({**current, **update_dict}))
+    
     result = await db.customers.update_one({"id": customer_id}, {"$set": update_dict})
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    collection_versions.bump("customers")
     return {"message": "Cliente atualizado"}
 
 @api_router.delete("/customers/{customer_id}")
@@ -345,197 +478,426 @@ async def delete_customer(customer_id: str):
     result = await db.customers.delete_one({"id": customer_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Cliente não encontrado")
+    collection_versions.bump("customers")
     return {"message": "Cliente excluído"}
 
+def encode_order_cursor(order: dict) -> str:
+    created_at = order['created_at']
+    if isinstance(created_at, datetime):
+        raw = json.dumps([created_at.isoformat(), order['id'], "date"])
+    else:
+        raw = json.dumps([created_at, order['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_order_cursor(cursor: str):
+    """(created_at, id) do último pedido da página; created_at volta como datetime ou texto, como estava no banco"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Vem do cliente e vai para a consulta: só [texto, texto] ou [texto, texto, "date"]
+        if (not isinstance(values, list) or len(values) not in (2, 3) or values[2:] not in ([], ["date"])
+                or not all(isinstance(value, str) for value in values)):
+            raise ValueError(cursor)
+        created_at, order_id = values[0], values[1]
+        if values[2:] == ["date"]:
+            created_at = parse_stored_date(created_at)
+            if created_at is None:
+                raise ValueError(cursor)
+        return created_at, order_id
+    except (ValueError, TypeError, IndexError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def order_keyset_filter(cursor: str) -> dict:
+    """Pedidos depois do cursor na ordem (created_at, id) decrescente"""
+    cursor_created_at, cursor_id = decode_order_cursor(cursor)
+    branches = [
+        {"created_at": {"$lt": cursor_created_at}},
+        {"created_at": cursor_created_at, "id": {"$lt": cursor_id}},
+    ]
+    if isinstance(cursor_created_at, datetime) and not date_migration.done:
+        # No BSON, texto ordena antes de data: na ordem decrescente os pedidos
+        # ainda não migrados vêm depois de todos os de data nativa
+        branches.append({"created_at": {"$type": "string"}})
+    return {"$or": branches}
+
+def order_filter(status=None, date_from=None, date_to=None, attendant_code=None, order_type=None) -> dict:
+    """Filtros comuns à listagem e à exportação de pedidos"""
+    query = {}
+    if status:
+        statuses = [s for s in status.split(",") if s]
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if attendant_code:
+        query["attendant_code"] = attendant_code
+    if order_type:
+        query["order_type"] = order_type
+    if date_from or date_to:
+        start = parse_report_date(date_from) if date_from else datetime.min.replace(tzinfo=timezone.utc)
+        end = parse_report_date(date_to) if date_to else datetime.now(timezone.utc)
+        query.update(report_date_filter(start, end))
+    return query
+
 @api_router.get("/orders", response_model=List[Order])
-async def get_orders(status: Optional[str] = None):
-    query = {"status": status} if status else {}
-    orders = await db.orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    for o in orders:
-        if isinstance(o['created_at'], str):
-            o['created_at'] = datetime.fromisoformat(o['created_at'])
-    return orders
+async def get_orders(
+    response: Response,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    attendant_code: Optional[str] = None,
+    order_type: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
+    """Lista pedidos do mais recente para o mais antigo.
+
+    `status` aceita vários valores separados por vírgula (ex.: pending,preparing,ready).
+    A paginação é por cursor sobre (created_at, id): quando há mais resultados, o
+    cabeçalho X-Next-Cursor traz o valor a ser enviado em `cursor` na próxima chamada.
+    """
+    query = order_filter(status, date_from, date_to, attendant_code, order_type)
+    if cursor:
+        keyset = order_keyset_filter(cursor)
+        query = {"$and": [query, keyset]} if query else keyset
+
+    orders = await db.orders.find(query, {"_id": 0}).sort(
+        [("created_at", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = encode_order_cursor(orders[-1])
+
+    return orders_json.response(orders, response)
 
 @api_router.post("/orders", response_model=Order)
 async def create_order(order_input: OrderCreate):
-    # Get next order number
-    last_order = await db.orders.find_one({}, {"order_number": 1}, sort=[("order_number", -1)])
-    next_number = (last_order['order_number'] + 1) if last_order else 1
-    
+    created_at = datetime.now(timezone.utc)
     order_dict = order_input.model_dump()
-    order_dict['order_number'] = next_number
+    order_dict['order_number'] = await next_order_number(created_at)
+    order_dict['created_at'] = created_at
     order_obj = Order(**order_dict)
     doc = order_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['order_day'] = created_at.date().isoformat()
     
-    await db.orders.insert_one(doc)
+    try:
+        await db.orders.insert_one(doc)
+    except DuplicateKeyError:
+        # Contador atrás dos pedidos existentes (ex.: banco restaurado): realinha e tenta de novo
+        await seed_order_counter()
+        order_obj.order_number = doc['order_number'] = await next_order_number(created_at)
+        doc.pop('_id', None)
+        await db.orders.insert_one(doc)
+    await daily_rollups.record_created(doc)
+    publish_order_event("order_created", doc)
     return order_obj
 
 @api_router.patch("/orders/{order_id}/status")
 async def update_order_status(order_id: str, update: OrderStatusUpdate):
-    result = await db.orders.update_one({"id": order_id}, {"$set": {"status": update.status}})
-    if result.modified_count == 0:
+    # Documento de antes: o rollup do dia move a contagem do status antigo para o novo
+    before = await db.orders.find_one_and_update(
+        {"id": order_id},
+        {"$set": {"status": update.status}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if not before:
         raise HTTPException(status_code=404, detail="Pedido nao encontrado")
+    await daily_rollups.record_status_change(before, update.status)
+    publish_order_event("order_updated", {**before, "status": update.status})
     return {"message": "Status atualizado"}
 
+# ===== KITCHEN STREAM =====
+# "local": eventos publicados pelos handlers deste processo
+# "changestream": eventos lidos do MongoDB (vários processos/réplicas da API)
+ORDER_EVENTS_SOURCE = os.environ.get('ORDER_EVENTS_SOURCE', 'local').lower()
+KITCHEN_STATUSES = "pending,preparing,ready"
+STREAM_HEARTBEAT_SECONDS = 15
+
+def publish_order_event(event_type: str, order: dict):
+    if ORDER_EVENTS_SOURCE == "local":
+        order_events.publish(event_type, {k: v for k, v in order.items() if k != '_id'})
+
+def sse_message(event: str, data) -> str:
+    # orjson grava datetime em ISO 8601, como as demais respostas
+    return f"event: {event}\ndata: {orjson.dumps(data, default=str).decode()}\n\n"
+
+@api_router.get("/orders/export")
+async def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    attendant_code: Optional[str] = None,
+    order_type: Optional[str] = None,
+):
+    """Exporta pedidos (mais antigo primeiro) em NDJSON ou CSV, sem limite de linhas.
+
+    Percorre os meses arquivados do período e depois a coleção orders, lendo cada
+    cursor do MongoDB em lotes e enviando cada lote assim que formatado.
+    """
+    query = order_filter(status, date_from, date_to, attendant_code, order_type)
+    start = parse_report_date(date_from) if date_from else None
+    end = parse_report_date(date_to) + timedelta(days=1) if date_to else None
+    collections = [*order_archive.collections_for_range(start, end), "orders"]
+
+    async def orders():
+        for name in collections:
+            cursor = db[name].find(query, {"_id": 0, "order_day": 0}).sort(
+                [("created_at", 1), ("id", 1)]
+            ).batch_size(EXPORT_BATCH)
+            async for order in cursor:
+                yield order
+
+    encoder = OrderExportEncoder(format)
+    filename = export_filename(format, date_from, date_to)
+    return StreamingResponse(
+        aiter_export(orders(), encoder),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@api_router.get("/orders/stream")
+async def stream_orders(status: str = KITCHEN_STATUSES):
+    """Server-Sent Events: snapshot dos pedidos ativos seguido de eventos incrementais.
+
+    Eventos: `snapshot` (lista de pedidos), `order_created` e `order_updated` (pedido completo).
+    Quando o cliente fica para trás o servidor reenvia um `snapshot`.
+    """
+    statuses = [s for s in status.split(",") if s]
+
+    async def load_snapshot():
+        return await db.orders.find(
+            {"status": {"$in": statuses}}, {"_id": 0}
+        ).sort([("created_at", -1), ("id", -1)]).to_list(1000)
+
+    async def event_stream():
+        # Assina antes do snapshot para não perder eventos entre os dois
+        queue = order_events.subscribe()
+        try:
+            yield sse_message("snapshot", await load_snapshot())
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event["type"] == "resync":
+                    yield sse_message("snapshot", await load_snapshot())
+                else:
+                    yield sse_message(event["type"], event["order"])
+        finally:
+            order_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ===== REPORTS =====
+def parse_report_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida: {value} (use AAAA-MM-DD)")
+
+def report_date_filter(start: datetime, end: datetime) -> dict:
+    """Filtro de created_at para o intervalo [start, end] (dias inteiros, UTC)"""
+    day_start = datetime.combine(start.date(), datetime.min.time(), tzinfo=timezone.utc)
+    end_exclusive = datetime.combine(end.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return date_migration.created_at_range(day_start, end_exclusive)
+
+def archive_union(start: datetime, end: datetime) -> list:
+    """Estágios $unionWith das coleções de arquivo que cobrem [start, end] (dias inteiros)"""
+    match = {"$match": report_date_filter(start, end)}
+    end_exclusive = datetime.combine(end.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    return [
+        {"$unionWith": {"coll": name, "pipeline": [match]}}
+        for name in order_archive.collections_for_range(start, end_exclusive)
+    ]
+
+async def build_sales_report(start: datetime, end: datetime) -> dict:
+    """Agrega os pedidos do intervalo em uma única consulta ($match/$facet)"""
+    pipeline = [
+        {"$match": report_date_filter(start, end)},
+        # Meses já arquivados entram no mesmo $facet
+        *archive_union(start, end),
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "total_orders": {"$sum": 1},
+                    "total_revenue": {"$sum": "$total_price"},
+                }},
+            ],
+            "by_status": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ],
+            "by_size": [
+                {"$unwind": "$items"},
+                {"$group": {"_id": "$items.size", "count": {"$sum": 1}}},
+            ],
+            "by_attendant": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$attendant_name", "Desconhecido"]},
+                    "count": {"$sum": 1},
+                    "total": {"$sum": "$total_price"},
+                }},
+                {"$sort": {"total": -1}},
+            ],
+            "by_payment": [
+                {"$group": {
+                    "_id": {"$ifNull": ["$payment_method", "DINHEIRO"]},
+                    "count": {"$sum": 1},
+                    "total": {"$sum": "$total_price"},
+                }},
+                {"$sort": {"total": -1}},
+            ],
+            "by_day": [
+                {"$group": {
+                    # $substr converte datas nativas para texto ISO (UTC), então serve aos dois formatos
+                    "_id": {"$substr": ["$created_at", 0, 10]},
+                    "count": {"$sum": 1},
+                    "total": {"$sum": "$total_price"},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+        }},
+    ]
+    result = await db.orders.aggregate(pipeline).to_list(1)
+    facets = result[0] if result else {}
+
+    totals = facets.get("totals") or [{}]
+    status_counts = {s["_id"]: s["count"] for s in facets.get("by_status", [])}
+    marmitas_by_size = {"P": 0, "M": 0, "G": 0}
+    for s in facets.get("by_size", []):
+        if s["_id"]:
+            marmitas_by_size[s["_id"]] = s["count"]
+
+    return {
+        "start": start.date().isoformat(),
+        "end": end.date().isoformat(),
+        "total_orders": totals[0].get("total_orders", 0),
+        "total_revenue": round(totals[0].get("total_revenue", 0), 2),
+        "status_counts": status_counts,
+        "marmitas_by_size": marmitas_by_size,
+        "sales_by_attendant": [
+            {"attendant_name": a["_id"], "count": a["count"], "total": round(a["total"], 2)}
+            for a in facets.get("by_attendant", [])
+        ],
+        "sales_by_payment": [
+            {"payment_method": p["_id"], "count": p["count"], "total": round(p["total"], 2)}
+            for p in facets.get("by_payment", [])
+        ],
+        "days": [
+            {"date": d["_id"], "count": d["count"], "total": round(d["total"], 2)}
+            for d in facets.get("by_day", [])
+        ],
+    }
+
+@api_router.get("/reports/daily")
+async def get_daily_report(date: Optional[str] = None):
+    """Totais de vendas de um dia (padrão: hoje)"""
+    day = parse_report_date(date) if date else datetime.now(timezone.utc)
+    return await sales_report(day, day)
+
+@api_router.get("/reports/range")
+async def get_range_report(start: str, end: str):
+    """Totais de vendas de um intervalo de datas, com quebra por dia"""
+    start_day = parse_report_date(start)
+    end_day = parse_report_date(end)
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="Data final anterior à data inicial")
+    return await sales_report(start_day, end_day)
+
+async def sales_report(start: datetime, end: datetime) -> dict:
+    """Relatório pelos daily_rollups; enquanto o histórico não foi reconstruído, direto dos pedidos"""
+    if daily_rollups.ready:
+        return await daily_rollups.report(start.date(), end.date())
+    return await build_sales_report(start, end)
+
+async def find_order(order_id: str) -> Optional[dict]:
+    """Pedido pelo id, na coleção orders ou no arquivo (reimpressão de pedidos antigos)"""
+    order = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    if order is None:
+        order = await order_archive.find_order(order_id, {"_id": 0})
+    return order
+
 @api_router.get("/orders/{order_id}/receipt")
 async def get_order_receipt(order_id: str):
     """Get receipt preview without printing"""
-    order_dict = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    order_dict = await find_order(order_id)
     if not order_dict:
         raise HTTPException(status_code=404, detail="Pedido nao encontrado")
     
-    settings_dict = await db.settings.find_one({"id": "settings"}, {"_id": 0})
-    settings = Settings(**settings_dict) if settings_dict else Settings()
+    settings = await settings_cache.get()
     
-    receipt_text = generate_receipt_text(order_dict, settings)
+    receipt_text = receipt_layout(settings).order_text(order_dict)
     return {"receipt": receipt_text, "order_number": order_dict['order_number']}
 
 @api_router.post("/orders/{order_id}/print")
-async def print_order(order_id: str):
+async def print_order(order_id: str, batch: bool = True):
     """Print order (can be used for reprint)"""
-    order_dict = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    order_dict = await find_order(order_id)
     if not order_dict:
         raise HTTPException(status_code=404, detail="Pedido nao encontrado")
     
-    settings_dict = await db.settings.find_one({"id": "settings"}, {"_id": 0})
-    settings = Settings(**settings_dict) if settings_dict else Settings()
+    settings = await settings_cache.get()
     
     # Check if it's a company order - print individual receipts
     if order_dict.get('is_company_order'):
-        return await print_company_order(order_dict, settings)
+        return await print_company_order(order_dict, settings, batch)
     else:
         return await print_single_order(order_dict, settings)
 
 async def print_single_order(order_dict, settings):
     """Print a single receipt for the whole order"""
-    receipt_text = generate_receipt_text(order_dict, settings)
+    layout = receipt_layout(settings)
     
     if settings.printer_type == "windows":
         # Generate print file for Windows default printer
-        return generate_windows_print(receipt_text, order_dict['order_number'])
+        return generate_windows_print(layout.order_text(order_dict), order_dict['order_number'])
     else:
         # Use thermal printer
-        return send_to_thermal_printer(receipt_text, settings, order_dict['id'])
+        return queue_thermal_print([layout.order_escpos(order_dict)], settings, order_dict['id'], f"#{order_dict['order_number']}")
 
-async def print_company_order(order_dict, settings):
+async def print_company_order(order_dict, settings, batch=True):
     """Print individual receipts for each employee"""
-    receipts = []
+    layout = receipt_layout(settings)
+    employees = layout.employee_receipts(order_dict)
     
-    for idx, item in enumerate(order_dict['items'], 1):
-        employee_name = item.get('employee_name', f"Funcionário {idx}")
-        receipt_text = generate_employee_receipt(order_dict, item, employee_name, settings)
-        
-        if settings.printer_type == "windows":
-            receipts.append(generate_windows_print(receipt_text, f"{order_dict['order_number']}-{idx}"))
-        else:
-            receipts.append(send_to_thermal_printer(receipt_text, settings, order_dict['id']))
+    if settings.printer_type != "windows" and batch:
+        # Todos os cupons num único job: uma conexão, corte entre cupons, progresso por cupom
+        parts = [layout.employee_escpos(order_dict, item, name) for item, name in employees]
+        result = queue_thermal_print(parts, settings, order_dict['id'], f"#{order_dict['order_number']} (empresa)")
+        result["count"] = len(parts)
+        if result.get("queued"):
+            result["message"] = f"{len(parts)} cupons enviados para a fila de impressão (1 por funcionário)"
+        return result
+    
+    if settings.printer_type != "windows":
+        # Um job por cupom; o pedido só fica impresso quando todos terminarem sem falha
+        on_done = mark_order_printed_when_all_done(len(employees))
+        jobs = []
+        for idx, (item, employee_name) in enumerate(employees, 1):
+            receipt_bytes = layout.employee_escpos(order_dict, item, employee_name)
+            result = queue_thermal_print([receipt_bytes], settings, order_dict['id'],
+                                         f"#{order_dict['order_number']}-{idx}", on_done=on_done)
+            if not result.get("queued"):
+                return result
+            jobs.append(result["job_id"])
+        return {"message": f"{len(jobs)} cupons enviados para a fila de impressão (1 por funcionário)",
+                "printed": False, "queued": True, "type": "thermal", "count": len(jobs), "job_ids": jobs}
+    
+    receipts = []
+    for idx, (item, employee_name) in enumerate(employees, 1):
+        receipt_text = layout.employee_text(order_dict, item, employee_name)
+        receipts.append(generate_windows_print(receipt_text, f"{order_dict['order_number']}-{idx}"))
     
     await db.orders.update_one({"id": order_dict['id']}, {"$set": {"printed": True}})
     return {"message": f"{len(receipts)} cupons gerados (1 por funcionário)", "printed": True, "count": len(receipts)}
 
-def generate_receipt_text(order_dict, settings):
-    """Generate receipt text for full order"""
-    lines = []
-    lines.append("=" * 40)
-    lines.append(settings.store_name.center(40))
-    lines.append(settings.store_address.center(40))
-    lines.append("=" * 40)
-    lines.append(f"Pedido: #{order_dict['order_number']}")
-    lines.append(f"Cliente: {order_dict['customer_name']}")
-    lines.append(f"Tipo: {order_dict['order_type']}")
-    
-    if order_dict['order_type'] == 'ENTREGA' and order_dict.get('delivery_address'):
-        lines.append(f"Endereco: {order_dict['delivery_address']}")
-    
-    lines.append("-" * 40)
-    
-    # Print each marmita
-    for idx, item in enumerate(order_dict['items'], 1):
-        lines.append(f"\nMarmita {idx} ({item['size']}):")
-        if item.get('employee_name'):
-            lines.append(f"  Para: {item['employee_name']}")
-        # Suporta tanto 'protein' quanto 'proteins'
-        proteins = item.get('proteins', [item.get('protein', '')])
-        if isinstance(proteins, list):
-            lines.append(f"  Mistura: {' + '.join(proteins)}")
-        else:
-            lines.append(f"  Mistura: {proteins}")
-        if item.get('accompaniments'):
-            lines.append(f"  Acomp.: {', '.join(item['accompaniments'])}")
-    
-    lines.append("-" * 40)
-    
-    if order_dict.get('salads') and len(order_dict['salads']) > 0:
-        lines.append(f"Saladas: {', '.join(order_dict['salads'])}")
-    
-    if order_dict.get('beverages') and len(order_dict['beverages']) > 0:
-        lines.append(f"Bebidas: {', '.join(order_dict['beverages'])}")
-    
-    if order_dict.get('coffees') and len(order_dict['coffees']) > 0:
-        lines.append(f"Cafes: {', '.join(order_dict['coffees'])}")
-    
-    if order_dict.get('snacks') and len(order_dict['snacks']) > 0:
-        lines.append(f"Lanches: {', '.join(order_dict['snacks'])}")
-    
-    if order_dict.get('desserts') and len(order_dict['desserts']) > 0:
-        lines.append(f"Sobremesas: {', '.join(order_dict['desserts'])}")
-    
-    if order_dict.get('others') and len(order_dict['others']) > 0:
-        lines.append(f"Outros: {', '.join(order_dict['others'])}")
-    
-    if order_dict.get('observations'):
-        lines.append(f"Obs: {order_dict['observations']}")
-    
-    lines.append("-" * 40)
-    lines.append(f"TOTAL: R$ {order_dict['total_price']:.2f}")
-    
-    # Pagamento
-    payment_method = order_dict.get('payment_method', 'DINHEIRO')
-    lines.append(f"Pagamento: {payment_method}")
-    
-    if payment_method == "DINHEIRO":
-        amount_paid = order_dict.get('amount_paid', 0)
-        change_amount = order_dict.get('change_amount', 0)
-        if amount_paid > 0:
-            lines.append(f"Valor Recebido: R$ {amount_paid:.2f}")
-            lines.append(f"TROCO: R$ {change_amount:.2f}")
-    
-    lines.append("-" * 40)
-    lines.append(f"Atendente: {order_dict['attendant_name']}")
-    lines.append(f"Data: {order_dict.get('created_at', '')[:19]}")
-    lines.append("=" * 40)
-    lines.append("     Obrigado pela preferencia!")
-    lines.append("=" * 40)
-    lines.append("\n\n\n")
-    
-    return "\n".join(lines)
-
-def generate_employee_receipt(order_dict, item, employee_name, settings):
-    """Generate individual receipt for one employee"""
-    lines = []
-    lines.append("=" * 40)
-    lines.append(settings.store_name.center(40))
-    lines.append("=" * 40)
-    lines.append(f"Pedido: #{order_dict['order_number']}")
-    lines.append(f"Empresa: {order_dict['customer_name']}")
-    lines.append(f"\n>>> PARA: {employee_name} <<<\n")
-    lines.append("-" * 40)
-    lines.append(f"Tamanho: {item['size']}")
-    # Suporta tanto 'protein' quanto 'proteins'
-    proteins = item.get('proteins', [item.get('protein', '')])
-    if isinstance(proteins, list):
-        lines.append(f"Mistura: {' + '.join(proteins)}")
-    else:
-        lines.append(f"Mistura: {proteins}")
-    if item.get('accompaniments'):
-        lines.append("Acompanhamentos:")
-        for acc in item['accompaniments']:
-            lines.append(f"  - {acc}")
-    lines.append("=" * 40)
-    lines.append("\n\n\n")
-    
-    return "\n".join(lines)
+def receipt_layout(settings):
+    """Layout do cupom compilado (reaproveitado enquanto nome/endereço da loja não mudam)"""
+    return receipt_engine.layout(settings.store_name, settings.store_address)
 
 def generate_windows_print(text, order_number):
     """Generate print file for Windows default printer"""
@@ -556,45 +918,57 @@ def generate_windows_print(text, order_number):
         "type": "windows"
     }
 
-def send_to_thermal_printer(text, settings, order_id):
-    """Send to thermal ESC/POS printer"""
-    try:
-        from escpos.printer import Network, Dummy
-        
-        if not settings.printer_ip:
-            return {"message": "IP da impressora não configurado", "printed": False}
-        
-        printer = Network(settings.printer_ip, port=settings.printer_port)
-        
-        # Convert text to ESC/POS commands
-        dummy = Dummy()
-        dummy.set(align='left')
-        for line in text.split('\n'):
-            dummy.text(line + '\n')
-        dummy.cut()
-        
-        printer._raw(dummy.output)
-        printer.close()
-        
-        return {"message": "Impresso em impressora térmica", "printed": True, "type": "thermal"}
-    except Exception as e:
-        logging.error(f"Erro ao imprimir: {e}")
-        return {"message": f"Erro: {str(e)}", "printed": False}
+async def mark_order_printed(job):
+    if job.status == "done" and job.order_id:
+        await db.orders.update_one({"id": job.order_id}, {"$set": {"printed": True}})
+
+def mark_order_printed_when_all_done(total):
+    """Callback compartilhado pelos `total` jobs de um pedido: marca impresso quando o último
+    terminar, se nenhum falhou"""
+    finished = []
+
+    async def on_done(job):
+        finished.append(job)
+        if len(finished) == total and all(j.status == "done" for j in finished):
+            await mark_order_printed(job)
+    return on_done
+
+def queue_thermal_print(parts, settings, order_id, label=None, on_done=mark_order_printed):
+    """Enfileira cupom(ns) ESC/POS na impressora térmica (não bloqueia a requisição).
+
+    `parts` é a lista de cupons já renderizados, enviados em sequência num só job.
+    """
+    if not settings.printer_ip:
+        return {"message": "IP da impressora não configurado", "printed": False}
+    
+    job = print_queue.submit(
+        settings.printer_ip,
+        settings.printer_port,
+        parts,
+        order_id=order_id,
+        label=label,
+        on_done=on_done,
+    )
+    return {"message": "Cupom enviado para a fila de impressão", "printed": False, "queued": True,
+            "type": "thermal", "job_id": job.id}
+
+@api_router.get("/print-jobs")
+async def get_print_jobs(order_id: Optional[str] = None):
+    return [job.to_dict() for job in print_queue.list(order_id)]
+
+@api_router.get("/print-jobs/{job_id}")
+async def get_print_job(job_id: str):
+    job = print_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de impressão não encontrado")
+    return job.to_dict()
 
 @api_router.get("/settings", response_model=Settings)
-async def get_settings():
-    settings_dict = await db.settings.find_one({"id": "settings"}, {"_id": 0})
-    if not settings_dict:
-        # Create default settings
-        settings = Settings()
-        doc = settings.model_dump()
-        doc['updated_at'] = doc['updated_at'].isoformat()
-        await db.settings.insert_one(doc)
-        return settings
-    
-    if isinstance(settings_dict['updated_at'], str):
-        settings_dict['updated_at'] = datetime.fromisoformat(settings_dict['updated_at'])
-    return Settings(**settings_dict)
+async def get_settings(request: Request, response: Response):
+    not_modified = collection_versions.check(request, response, "settings")
+    if not_modified:
+        return not_modified
+    return await settings_cache.get()
 
 @api_router.patch("/settings")
 async def update_settings(update: SettingsUpdate):
@@ -602,9 +976,11 @@ async def update_settings(update: SettingsUpdate):
     if not update_dict:
         raise HTTPException(status_code=400, detail="Nenhum campo para atualizar")
     
-    update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_dict['updated_at'] = datetime.now(timezone.utc)
     
     await db.settings.update_one({"id": "settings"}, {"$set": update_dict}, upsert=True)
+    settings_cache.invalidate()
+    collection_versions.bump("settings")
     return {"message": "Configurações atualizadas"}
 
 # Initialize default admin user
@@ -619,10 +995,35 @@ async def startup_event():
             role="admin",
             password=hash_password("admin123")
         )
-        doc = admin_user.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.users.insert_one(doc)
+        await db.users.insert_one(admin_user.model_dump())
         logging.info("Admin padrão criado: admin / admin123")
+    
+    await seed_order_counter()
+    await backfill_customer_search_terms()
+    await index_manager.bootstrap()
+    
+    # Converte datas antigas em texto para datetime em segundo plano (retomável)
+    await date_migration.load_state()
+    date_migration.start()
+    
+    # Totais diários: na primeira vez, reconstrói o histórico antes de aceitar requisições
+    await daily_rollups.load_state()
+    await daily_rollups.ensure_built()
+    
+    # Move pedidos finalizados antigos para as coleções de arquivo (ORDER_ARCHIVE_DAYS)
+    await order_archive.refresh_months()
+    order_archive.start()
+    
+    if ORDER_EVENTS_SOURCE == "changestream":
+        order_events.start_change_stream(db.orders)
+    
+    # Verificação online da licença fora das requisições
+    license_manager.start_refresher()
+
+# Métricas no formato do Prometheus (ver metrics.py); fora do /api, onde o scraper espera
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 app.include_router(api_router)
 
@@ -632,7 +1033,10 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Por último: envolve também o CORS e mede a requisição inteira
+app.add_middleware(MetricsMiddleware)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -642,4 +1046,9 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await order_events.stop_change_stream()
+    await license_manager.stop_refresher()
+    await date_migration.stop()
+    await order_archive.stop()
+    await print_queue.shutdown()
     client.close()
\ No newline at end of file
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark do motor de cupons (backend/receipt_engine.py)
+Mede cupons/segundo num pedido de empresa grande, comparando:
+- layout recompilado a cada cupom (como era antes) x layout em cache
+- texto x bytes ESC/POS direto x texto convertido pelo python-escpos (se instalado)
+
+Execute: python benchmarks/bench_receipts.py [--marmitas 100] [--rounds 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+from receipt_engine import ReceiptLayout, receipt_engine  # noqa: E402
+
+STORE_NAME = "Dona Guedes"
+STORE_ADDRESS = "Rua Principal, 123"
+
+
+def build_company_order(marmitas):
+    return {
+        "id": "bench",
+        "order_number": 1234,
+        "customer_name": "Metalurgica Exemplo Ltda",
+        "is_company_order": True,
+        "order_type": "ENTREGA",
+        "delivery_address": "Av. das Industrias, 1000 - Galpao 3",
+        "items": [
+            {
+                "employee_name": f"Funcionario {i:03d}",
+                "size": "PMG"[i % 3],
+                "proteins": ["Frango grelhado", "Bife acebolado"][: 1 + i % 2],
+                "accompaniments": ["Arroz", "Feijao", "Farofa", "Salada de maionese"],
+            }
+            for i in range(marmitas)
+        ],
+        "salads": ["Alface", "Tomate"],
+        "beverages": ["Refrigerante 2L"] * 5,
+        "coffees": [],
+        "snacks": [],
+        "desserts": ["Pudim"] * 10,
+        "others": [],
+        "observations": "Entregar ate 11h30 na portaria",
+        "total_price": 22.5 * marmitas,
+        "payment_method": "FIADO",
+        "amount_paid": 0,
+        "change_amount": 0,
+        "attendant_name": "Ana",
+        "created_at": "2026-10-18T11:02:33.123456+00:00",
+    }
+
+
+def measure(label, func, receipts_per_call, rounds):
+    func()  # aquecimento
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - start
+    rate = receipts_per_call * rounds / elapsed
+    print(f"  {label:<44} {rate:>12,.0f} cupons/s   ({elapsed * 1000 / rounds:8.2f} ms/pedido)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--marmitas", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    order = build_company_order(args.marmitas)
+    n = args.marmitas
+
+    print("=" * 80)
+    print(f"  Cupons de um pedido de empresa com {n} marmitas ({args.rounds} rodadas)")
+    print("=" * 80)
+
+    def employee_text_uncached():
+        for item in order["items"]:
+            ReceiptLayout(STORE_NAME, STORE_ADDRESS).employee_text(order, item, item["employee_name"])
+
+    def employee_text_cached():
+        layout = receipt_engine.layout(STORE_NAME, STORE_ADDRESS)
+        for item, name in layout.employee_receipts(order):
+            layout.employee_text(order, item, name)
+
+    def employee_escpos_cached():
+        layout = receipt_engine.layout(STORE_NAME, STORE_ADDRESS)
+        for item, name in layout.employee_receipts(order):
+            layout.employee_escpos(order, item, name)
+
+    measure("texto, layout recompilado por cupom", employee_text_uncached, n, args.rounds)
+    measure("texto, layout em cache", employee_text_cached, n, args.rounds)
+    measure("ESC/POS direto, layout em cache", employee_escpos_cached, n, args.rounds)
+
+    try:
+        from escpos.printer import Dummy
+    except ImportError:
+        print("  (python-escpos nao instalado: comparacao com Dummy ignorada)")
+    else:
+        def employee_escpos_dummy():
+            layout = receipt_engine.layout(STORE_NAME, STORE_ADDRESS)
+            for item, name in layout.employee_receipts(order):
+                dummy = Dummy()
+                dummy.set(align='left')
+                for line in layout.employee_text(order, item, name).split('\n'):
+                    dummy.text(line + '\n')
+                dummy.cut()
+                dummy.output
+
+        measure("texto + python-escpos Dummy (antigo)", employee_escpos_dummy, n, args.rounds)
+
+    print()
+    print("  Cupom completo do pedido")
+    measure("texto", lambda: receipt_engine.layout(STORE_NAME, STORE_ADDRESS).order_text(order), 1, args.rounds)
+    measure("ESC/POS direto", lambda: receipt_engine.layout(STORE_NAME, STORE_ADDRESS).order_escpos(order), 1, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
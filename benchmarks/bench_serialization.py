@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark da serialização das listagens (backend/fast_json.py)
+Compara, para listas de pedidos como vêm do MongoDB:
+- caminho padrão do FastAPI: response_model=List[Order] (validação +
+  jsonable_encoder) e JSONResponse com o json da biblioteca padrão
+- ListEncoder: documentos confiáveis recortados nos campos do modelo e
+  serializados com orjson, sem validação
+Confere também que os dois produzem os mesmos pedidos (relidos pelo modelo
+Order: o texto difere só no formato, ex.: "+00:00" x "Z" e 0 x 0.0).
+
+Execute: python benchmarks/bench_serialization.py [--sizes 1000 10000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from fast_json import ListEncoder  # noqa: E402
+
+# server.py lê MONGO_URL/DB_NAME ao ser importado (o cliente só conecta no primeiro uso)
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+from server import Order  # noqa: E402
+
+
+def build_orders(count):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "order_number": i + 1,
+            "customer_name": f"Cliente {i}",
+            "is_company_order": i % 10 == 0,
+            "order_type": "ENTREGA" if i % 3 == 0 else "BALCAO",
+            "delivery_address": "Rua das Flores, 100" if i % 3 == 0 else None,
+            "items": [
+                {"size": "PMG"[j % 3], "proteins": ["Frango grelhado", "Bife acebolado"][: 1 + j % 2],
+                 "accompaniments": ["Arroz", "Feijao", "Farofa"]}
+                for j in range(1 + i % 3)
+            ],
+            "salads": ["Alface"],
+            "beverages": ["Refrigerante lata"] if i % 2 else [],
+            "coffees": [],
+            "snacks": [],
+            "desserts": [],
+            "others": [],
+            "observations": None,
+            "total_price": 22.5 * (1 + i % 3),
+            "payment_method": "PIX",
+            "amount_paid": 0,
+            "change_amount": 0,
+            "status": "completed",
+            "attendant_code": "01",
+            "attendant_name": "Ana",
+            "printed": True,
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+            "order_day": (start + timedelta(minutes=i)).date().isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def fastapi_default(field, docs):
+    content = asyncio.run(serialize_response(field=field, response_content=docs))
+    return JSONResponse(content).body
+
+
+def measure(label, func, rounds):
+    func()  # aquecimento
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = (time.perf_counter() - start) / rounds
+    print(f"  {label:<36} {elapsed * 1000:10.2f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    field = create_model_field(name="Response_get_orders", type_=List[Order], mode="serialization")
+    encoder = ListEncoder(Order)
+
+    for size in args.sizes:
+        docs = build_orders(size)
+        old_body = fastapi_default(field, docs)
+        new_body = encoder.encode(docs)
+        same = [Order.model_validate(o) for o in json.loads(old_body)] == \
+            [Order.model_validate(o) for o in json.loads(new_body)]
+
+        print("=" * 60)
+        print(f"  {size} pedidos ({len(new_body) / 1024:.0f} KB de JSON) - mesmos pedidos: {'sim' if same else 'NAO'}")
+        print("=" * 60)
+        old = measure("FastAPI response_model + JSONResponse", lambda: fastapi_default(field, docs), args.rounds)
+        new = measure("ListEncoder (orjson, sem validacao)", lambda: encoder.encode(docs), args.rounds)
+        print(f"  {'ganho':<36} {old / new:10.1f}x")
+        print()
+
+
+if __name__ == "__main__":
+    main()
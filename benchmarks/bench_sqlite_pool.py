@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark das conexões SQLite do servidor offline (desktop/server_offline.py)
+Chama os handlers direto de um pool de threads, como o threadpool do FastAPI
+faz sob carga, e compara:
+- antes: uma conexão nova por chamada, journal padrão (rollback), cada
+  requisição com a sua transação
+- pool + WAL: ConnectionPool (conexões reaproveitadas, WAL e pragmas), ainda
+  uma transação por requisição
+- db_writer: as escritas passam pela thread única com group commit (DbWriter)
+Duas cargas: só criação de pedidos, e criação junto com a tela da cozinha
+lendo os pedidos abertos. Mostra pedidos/s, leituras/s e quantas chamadas
+falharam com "database is locked".
+
+Execute: python benchmarks/bench_sqlite_pool.py [--threads 40] [--orders 2000] [--readers 8]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "desktop"))
+
+TMP_DIR = tempfile.mkdtemp(prefix="marmita_pool_")
+os.environ["DONA_GUEDES_DB"] = os.path.join(TMP_DIR, "import.db")
+
+import server_offline as so  # noqa: E402
+
+
+def legacy_get_db(path):
+    """get_db() como era: conexão nova a cada chamada"""
+    def get_db():
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        return conn
+    return get_db
+
+
+def prepare(name, wal):
+    path = os.path.join(TMP_DIR, f"{name}.db")
+    shutil.copyfile(os.environ["DONA_GUEDES_DB"], path)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+    conn.close()
+    return path
+
+
+def direct_create_order(order):
+    """create_order sem o db_writer: transação própria na thread do handler"""
+    conn = so.get_db()
+    conn.execute("BEGIN IMMEDIATE")
+    so.insert_order(conn.cursor(), order, str(uuid.uuid4()), datetime.now(timezone.utc).isoformat())
+    conn.commit()
+    conn.close()
+
+
+def build_order(i):
+    return so.OrderCreate(
+        customer_name=f"Cliente {i}",
+        order_type="ENTREGA",
+        items=[so.OrderItem(size="M", proteins=["Frango", "Bife"], accompaniments=["Arroz", "Feijao", "Farofa"])],
+        beverages=["Refrigerante"],
+        total_price=25.0,
+        attendant_code="at01",
+        attendant_name="Atendente 1",
+    )
+
+
+def run(args, readers, create_order):
+    errors = {"create": 0, "read": 0}
+    reads = [0]
+    stop = threading.Event()
+
+    def create(i):
+        try:
+            create_order(build_order(i))
+        except sqlite3.OperationalError:
+            errors["create"] += 1
+
+    def kitchen():
+        while not stop.is_set():
+            try:
+                so.get_orders(status="pending,preparing,ready", date_from=None, date_to=None,
+                              attendant_code=None, order_type=None, limit=200, cursor=None, view="full")
+                reads[0] += 1
+            except sqlite3.OperationalError:
+                errors["read"] += 1
+
+    reader_threads = [threading.Thread(target=kitchen) for _ in range(readers)]
+    for thread in reader_threads:
+        thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(create, range(args.orders)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in reader_threads:
+        thread.join()
+    return (args.orders - errors["create"]) / elapsed, reads[0] / elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=40, help="threads criando pedidos (padrão do anyio: 40)")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=8, help="threads lendo os pedidos abertos")
+    args = parser.parse_args()
+
+    so.db_writer.stop()
+    so.db_pool.close_all()
+    print(f"{args.orders} pedidos, {args.threads} threads; leitores: 0 e {args.readers}")
+    print(f"{'modo':<34}{'leitores':>9}{'pedidos/s':>11}{'leituras/s':>12}{'erros (criar/ler)':>19}")
+    try:
+        modes = (
+            ("antes (conexão por chamada)", "legacy"),
+            ("pool + WAL", "pool"),
+            ("pool + WAL + db_writer", "writer"),
+        )
+        for readers in (0, args.readers):
+            for label, mode in modes:
+                path = prepare(f"{mode}_{readers}", mode != "legacy")
+                pool = so.ConnectionPool(path) if mode != "legacy" else None
+                so.get_db = pool.acquire if pool else legacy_get_db(path)
+                writer = so.DbWriter(pool) if mode == "writer" else None
+                so.db_writer = writer
+                created, read, errors = run(args, readers, so.create_order if writer else direct_create_order)
+                if writer:
+                    writer.stop()
+                if pool:
+                    pool.close_all()
+                print(f"{label:<34}{readers:>9}{created:>11.0f}{read:>12.0f}"
+                      f"{errors['create']:>10}/{errors['read']}")
+    finally:
+        shutil.rmtree(TMP_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Teste de carga: simula o horário de almoço contra os dois backends
+- atendentes: buscam cliente, carregam o cardápio e criam pedidos (parte deles
+  de empresa, com muitas marmitas, mandados para a impressora)
+- cozinha: acompanha os pedidos abertos (polling de /orders ou, no online, o
+  mesmo barramento de eventos do /orders/stream) e avança o status
+- administradores: abrem o relatório do dia, do mês e a listagem de pedidos
+Os servidores rodam no próprio processo (transporte ASGI do httpx), sem rede:
+- online  (backend/server.py): MongoDB local via --mongo-url, ou mongomock_motor
+  se nenhum for informado (útil para comparar versões, não para números absolutos)
+- offline (desktop/server_offline.py): arquivo SQLite temporário
+A impressora é simulada: no online, um servidor TCP local que descarta os bytes
+(passa pela fila de impressão de verdade); no offline, print_to_windows é trocado
+por uma função que só conta os cupons.
+Ao final, mostra para cada endpoint: requisições, erros, req/s e p50/p95/p99 em ms.
+
+Execute: python benchmarks/load_test.py [--target online|offline|both] [--duration 30]
+         [--attendants 6] [--kitchens 2] [--admins 1] [--kitchen-mode poll|stream]
+         [--think 0.2] [--mongo-url mongodb://localhost:27017]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, "backend"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "desktop"))
+
+import httpx  # noqa: E402
+
+BASE_URL = "http://loadtest"
+OPEN_STATUSES = "pending,preparing,ready"
+NEXT_STATUS = {"pending": "preparing", "preparing": "ready", "ready": "completed"}
+COMPANY_ORDER_RATE = 0.1            # fração dos pedidos que é de empresa
+COMPANY_MARMITAS = (10, 40)
+CUSTOMERS = 500
+
+FIRST_NAMES = ["Maria", "Jose", "Ana", "Joao", "Antonio", "Francisca", "Carlos", "Paulo", "Lucas", "Juliana"]
+LAST_NAMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira", "Almeida", "Costa", "Gomes"]
+PRODUCTS = [
+    ("Arroz", "accompaniment"), ("Feijao", "accompaniment"), ("Farofa", "accompaniment"),
+    ("Macarrao", "accompaniment"), ("Pure de batata", "accompaniment"),
+    ("Frango grelhado", "protein"), ("Bife acebolado", "protein"), ("Linguica", "protein"),
+    ("Peixe frito", "protein"), ("Salada verde", "salad"), ("Refrigerante lata", "beverage"),
+    ("Suco natural", "beverage"),
+]
+ATTENDANTS = [("at01", "Atendente 1"), ("at02", "Atendente 2"), ("at03", "Atendente 3")]
+
+
+# ===== Medição =====
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def record(self, name: str, seconds: float, ok: bool = True):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil pelo posto mais próximo (values já ordenado)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def print_report(title: str, stats: Stats):
+    total = sum(len(v) for v in stats.latencies.values())
+    print(f"\n{title}: {total} requisições em {stats.elapsed:.1f}s ({total / stats.elapsed:.1f} req/s)")
+    print(f"{'endpoint':<36}{'n':>7}{'erros':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name in sorted(stats.latencies):
+        values = sorted(stats.latencies[name])
+        ms = [percentile(values, p) * 1000 for p in (50, 95, 99)]
+        print(f"{name:<36}{len(values):>7}{stats.errors[name]:>7}{len(values) / stats.elapsed:>9.1f}"
+              f"{ms[0]:>9.1f}{ms[1]:>9.1f}{ms[2]:>9.1f}{values[-1] * 1000:>9.1f}")
+
+
+# IDs nas rotas viram {id} para agrupar as medições por endpoint
+_ID_IN_PATH = re.compile(r"/[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class Session:
+    """Cliente HTTP que registra a latência de cada chamada em Stats"""
+
+    def __init__(self, http: httpx.AsyncClient, stats: Stats):
+        self.http = http
+        self.stats = stats
+
+    async def call(self, method: str, path: str, **kwargs) -> httpx.Response:
+        name = f"{method} {_ID_IN_PATH.sub('/{id}', path)}"
+        start = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, **kwargs)
+        except Exception:
+            self.stats.record(name, time.perf_counter() - start, ok=False)
+            raise
+        self.stats.record(name, time.perf_counter() - start, ok=response.status_code < 400)
+        return response
+
+
+# ===== Dados =====
+def customer_name(i: int) -> str:
+    return f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]} {i:03d}"
+
+
+def build_order(rng: random.Random, menu: Dict[str, List[str]], attendant, company: bool) -> Dict:
+    def item(employee=None):
+        size = rng.choice("PMG")
+        return {
+            "employee_name": employee,
+            "size": size,
+            "proteins": rng.sample(menu["protein"], 1 if size == "P" else 2),
+            "accompaniments": rng.sample(menu["accompaniment"], 3),
+        }
+
+    if company:
+        count = rng.randint(*COMPANY_MARMITAS)
+        items = [item(f"Funcionario {n:02d}") for n in range(1, count + 1)]
+        name = f"Empresa {rng.randint(1, 20):02d} Ltda"
+    else:
+        items = [item() for _ in range(rng.randint(1, 3))]
+        name = customer_name(rng.randrange(CUSTOMERS))
+    total = round(sum({"P": 18.0, "M": 22.0, "G": 26.0}[i["size"]] for i in items), 2)
+    return {
+        "customer_name": name,
+        "is_company_order": company,
+        "order_type": rng.choice(["ENTREGA", "RETIRADA", "LOCAL"]),
+        "delivery_address": "Rua Teste, 10",
+        "items": items,
+        "beverages": rng.sample(menu["beverage"], rng.randint(0, 1)),
+        "total_price": total,
+        "payment_method": rng.choice(["DINHEIRO", "PIX", "CARTAO"]),
+        "amount_paid": total,
+        "change_amount": 0,
+        "attendant_code": attendant[0],
+        "attendant_name": attendant[1],
+    }
+
+
+async def seed(session: Session) -> Dict[str, List[str]]:
+    for name, kind in PRODUCTS:
+        await session.http.post("/api/products", json={"name": name, "type": kind, "price": 5.0})
+    for i in range(CUSTOMERS):
+        await session.http.post("/api/customers", json={"name": customer_name(i), "phone": f"1998{i:07d}"})
+    response = await session.http.get("/api/products")
+    menu: Dict[str, List[str]] = defaultdict(list)
+    for product in response.json():
+        menu[product["type"]].append(product["name"])
+    return menu
+
+
+# ===== Papéis =====
+async def attendant(session: Session, menu, args, deadline: float, seed_value: int, printed: List[int]):
+    rng = random.Random(seed_value)
+    who = ATTENDANTS[seed_value % len(ATTENDANTS)]
+    while time.perf_counter() < deadline:
+        await session.call("GET", "/api/products", params={"active_only": "true"})
+        query = customer_name(rng.randrange(CUSTOMERS)).split()[0][: rng.randint(2, 5)]
+        await session.call("GET", "/api/customers/search", params={"q": query})
+        company = rng.random() < COMPANY_ORDER_RATE
+        response = await session.call("POST", "/api/orders", json=build_order(rng, menu, who, company))
+        if company and response.status_code < 400:
+            await session.call("POST", f"/api/orders/{response.json()['id']}/print")
+            printed[0] += 1
+        await asyncio.sleep(args.think)
+
+
+async def advance_one(session: Session, patch_method: str, orders: List[Dict], rng: random.Random):
+    if orders:
+        order = rng.choice(orders)
+        status = NEXT_STATUS.get(order.get("status"))
+        if status:
+            await session.call(patch_method, f"/api/orders/{order['id']}/status", json={"status": status})
+
+
+async def kitchen_poll(session: Session, patch_method: str, args, deadline: float, seed_value: int):
+    rng = random.Random(seed_value)
+    while time.perf_counter() < deadline:
+        response = await session.call("GET", "/api/orders", params={"status": OPEN_STATUSES, "limit": 200})
+        if response.status_code < 400:
+            await advance_one(session, patch_method, response.json(), rng)
+        await asyncio.sleep(args.poll_interval)
+
+
+async def kitchen_stream(session: Session, server, patch_method: str, args, deadline: float, seed_value: int):
+    """Tela da cozinha com SSE: uma carga inicial e depois só eventos.
+
+    O transporte ASGI do httpx só devolve a resposta quando ela termina, então
+    em vez de abrir /orders/stream assina o mesmo barramento (order_events) e
+    mede o atraso entre a criação do pedido e a chegada do evento.
+    """
+    rng = random.Random(seed_value)
+    queue = server.order_events.subscribe()
+    try:
+        response = await session.call("GET", "/api/orders", params={"status": OPEN_STATUSES, "limit": 200})
+        open_orders = {o["id"]: o for o in response.json()} if response.status_code < 400 else {}
+        while time.perf_counter() < deadline:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=max(0.01, deadline - time.perf_counter()))
+            except asyncio.TimeoutError:
+                break
+            order = event["order"]
+            if event["type"] == "order_created" and isinstance(order.get("created_at"), datetime):
+                delay = (datetime.now(timezone.utc) - order["created_at"]).total_seconds()
+                session.stats.record("evento order_created (SSE)", delay)
+            if order.get("status") in NEXT_STATUS and order.get("status") != "completed":
+                open_orders[order["id"]] = order
+            else:
+                open_orders.pop(order["id"], None)
+            if rng.random() < 0.5:
+                await advance_one(session, patch_method, list(open_orders.values()), rng)
+    finally:
+        server.order_events.unsubscribe(queue)
+
+
+async def admin(session: Session, args, deadline: float):
+    today = datetime.now(timezone.utc).date()
+    while time.perf_counter() < deadline:
+        await session.call("GET", "/api/reports/daily")
+        await session.call("GET", "/api/reports/range", params={
+            "start": today.replace(day=1).isoformat(), "end": today.isoformat()})
+        await session.call("GET", "/api/orders", params={"limit": 100})
+        await asyncio.sleep(args.admin_interval)
+
+
+async def run_load(session: Session, menu, args, patch_method: str, server=None) -> int:
+    deadline = time.perf_counter() + args.duration
+    printed = [0]
+    tasks = [attendant(session, menu, args, deadline, i, printed) for i in range(args.attendants)]
+    for i in range(args.kitchens):
+        if args.kitchen_mode == "stream" and server is not None:
+            tasks.append(kitchen_stream(session, server, patch_method, args, deadline, 1000 + i))
+        else:
+            tasks.append(kitchen_poll(session, patch_method, args, deadline, 1000 + i))
+    tasks += [admin(session, args, deadline) for _ in range(args.admins)]
+    session.stats.started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    session.stats.finish()
+    return printed[0]
+
+
+# ===== Alvos =====
+async def fake_printer():
+    """Impressora térmica simulada: aceita conexões e descarta os bytes"""
+    received = [0]
+
+    async def handle(reader, writer):
+        while data := await reader.read(65536):
+            received[0] += len(data)
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], received
+
+
+async def run_online(args):
+    os.environ["DB_NAME"] = f"loadtest_{uuid.uuid4().hex[:8]}"
+    if args.mongo_url:
+        os.environ["MONGO_URL"] = args.mongo_url
+    else:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+        from mongomock_motor import AsyncMongoMockClient
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+    import server
+    printer, port, received = await fake_printer()
+    await server.startup_event()
+    transport = httpx.ASGITransport(app=server.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=BASE_URL, timeout=60) as http:
+            session = Session(http, Stats())
+            await http.patch("/api/settings", json={
+                "printer_type": "thermal", "printer_ip": "127.0.0.1", "printer_port": port})
+            menu = await seed(session)
+            printed = await run_load(session, menu, args, "PATCH", server)
+            # Espera a fila de impressão esvaziar para contar os bytes enviados
+            await asyncio.sleep(0.5)
+        print_report(f"online ({'mongod' if args.mongo_url else 'mongomock'})", session.stats)
+        print(f"pedidos de empresa impressos: {printed} ({received[0] / 1024:.0f} KiB enviados à impressora)")
+    finally:
+        if args.mongo_url:
+            await server.client.drop_database(os.environ["DB_NAME"])
+        await server.shutdown_db_client()
+        printer.close()
+        await printer.wait_closed()
+
+
+async def run_offline(args):
+    tmp_dir = tempfile.mkdtemp(prefix="marmita_load_")
+    os.environ["DONA_GUEDES_DB"] = os.path.join(tmp_dir, "load.db")
+    try:
+        import server_offline
+        printed_receipts = [0]
+
+        def sink(text):
+            printed_receipts[0] += 1
+
+        server_offline.print_to_windows = sink
+        transport = httpx.ASGITransport(app=server_offline.app)
+        async with httpx.AsyncClient(transport=transport, base_url=BASE_URL, timeout=60) as http:
+            session = Session(http, Stats())
+            menu = await seed(session)
+            printed = await run_load(session, menu, args, "PATCH")
+        print_report("offline (SQLite)", session.stats)
+        print(f"pedidos de empresa impressos: {printed} ({printed_receipts[0]} cupons)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["online", "offline", "both"], default="both")
+    parser.add_argument("--duration", type=float, default=30, help="segundos de carga por backend")
+    parser.add_argument("--attendants", type=int, default=6)
+    parser.add_argument("--kitchens", type=int, default=2)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--kitchen-mode", choices=["poll", "stream"], default="poll",
+                        help="stream só se aplica ao online; o offline sempre faz polling")
+    parser.add_argument("--think", type=float, default=0.2, help="pausa do atendente entre pedidos (s)")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="intervalo do polling da cozinha (s)")
+    parser.add_argument("--admin-interval", type=float, default=2.0, help="intervalo entre relatórios (s)")
+    parser.add_argument("--mongo-url", help="MongoDB local; sem ele, usa mongomock_motor")
+    args = parser.parse_args()
+
+    if args.target in ("online", "both"):
+        await run_online(args)
+    if args.target in ("offline", "both"):
+        await run_offline(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
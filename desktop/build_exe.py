@@ -11,7 +11,7 @@ print("=" * 50)
 
 # 1. Instalar dependências
 print("\n[1/4] Instalando dependencias...")
-subprocess.run(["pip", "install", "pyinstaller", "fastapi", "uvicorn", "pydantic"], check=True)
+subprocess.run(["pip", "install", "pyinstaller", "fastapi", "uvicorn", "pydantic", "brotli"], check=True)
 
 # 2. Compilar frontend
 print("\n[2/4] Compilando frontend...")
@@ -25,6 +25,10 @@ if os.path.exists("static"):
     shutil.rmtree("static")
 shutil.copytree("../frontend/build", "static")
 
+# Variantes .gz/.br servidas direto pelo servidor (ver static_assets.py)
+from static_assets import precompress_directory
+print(f"  {precompress_directory('static')} arquivos comprimidos (.gz/.br)")
+
 # 4. Criar executável
 print("\n[4/4] Criando executavel...")
 subprocess.run([
@@ -34,6 +38,7 @@ subprocess.run([
     "--name=DonaGuedes",
     "--add-data=static;static",
     "--add-data=dona_guedes.db;.",
+    "--paths=../backend",
     "--icon=icon.ico",
     "server_offline.py"
 ], check=True)
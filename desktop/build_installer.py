@@ -13,6 +13,8 @@ import shutil
 import subprocess
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Modulos compartilhados com o backend online (ex.: receipt_engine)
+BACKEND_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "backend")
 
 def main():
     print("=" * 60)
@@ -28,7 +30,7 @@ def main():
         subprocess.run([sys.executable, "-m", "pip", "install", "pyinstaller"], check=True)
     
     # Check dependencies
-    deps = ["fastapi", "uvicorn", "pydantic"]
+    deps = ["fastapi", "uvicorn", "pydantic", "brotli"]
     for dep in deps:
         try:
             __import__(dep)
@@ -37,6 +39,11 @@ def main():
             print(f"[!] Instalando {dep}...")
             subprocess.run([sys.executable, "-m", "pip", "install", dep], check=True)
     
+    # Variantes .gz/.br do frontend, servidas direto pelo servidor (ver static_assets.py)
+    from static_assets import precompress_directory
+    count = precompress_directory(os.path.join(SCRIPT_DIR, "static"))
+    print(f"[OK] {count} arquivos do frontend comprimidos (.gz/.br)")
+    
     # Create output directory
     dist_dir = os.path.join(SCRIPT_DIR, "dist")
     if os.path.exists(dist_dir):
@@ -50,7 +57,7 @@ block_cipher = None
 
 a = Analysis(
     ['{os.path.join(SCRIPT_DIR, "server_offline.py")}'],
-    pathex=['{SCRIPT_DIR}'],
+    pathex=['{SCRIPT_DIR}', '{BACKEND_DIR}'],
     binaries=[],
     datas=[
         ('{os.path.join(SCRIPT_DIR, "static")}', 'static'),
@@ -1,26 +1,371 @@
 # Backend com SQLite para instalação offline
 # Mantém todas as funcionalidades do sistema original
 
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import uuid
 import json
 import sqlite3
 import os
 import hashlib
+import base64
+import threading
+import queue
+import time
+import sys
+from concurrent.futures import Future
+
+# Modulos compartilhados com o backend online (ex.: receipt_engine)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+from receipt_engine import receipt_engine
+from order_export import EXPORT_BATCH, EXPORT_FORMATS, OrderExportEncoder, iter_export, export_filename
+from customer_search import SEARCH_LIMIT_DEFAULT, SEARCH_LIMIT_MAX, customer_search_terms, prefix_range, search_key
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, TimedConnection,
+                     printer_failures, printer_jobs, printer_send_duration, registry as metrics_registry)
+from static_assets import StaticAssets
 
 # Database setup
-DB_PATH = os.path.join(os.path.dirname(__file__), "dona_guedes.db")
+# DONA_GUEDES_DB permite apontar para outro arquivo (ex.: benchmarks/load_test.py usa um banco temporario)
+DB_PATH = os.environ.get("DONA_GUEDES_DB") or os.path.join(os.path.dirname(__file__), "dona_guedes.db")
+
+# Pool de conexoes: abrir o arquivo a cada requisicao custa caro e, com o journal
+# padrao (rollback), leitores e escritores das threads do FastAPI se bloqueiam
+# ("database is locked"). Em WAL, leituras nao esperam a escrita em andamento.
+DB_POOL_SIZE = 8             # conexoes ociosas mantidas; num pico abre extras e fecha na devolucao
+DB_BUSY_TIMEOUT = 10         # segundos esperando o lock de escrita antes de "database is locked"
+DB_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",     # com WAL nao corrompe numa queda; fsync so no checkpoint
+    "PRAGMA cache_size = -16000",      # ~16 MB de cache de paginas por conexao
+    "PRAGMA mmap_size = 134217728",    # leituras de ate 128 MB do arquivo via mmap
+    "PRAGMA temp_store = MEMORY",
+)
+
+class PooledConnection(TimedConnection):
+    # TimedConnection mede cada comando para o /metrics; close() devolve a conexao ao pool
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+class ConnectionPool:
+    def __init__(self, path, size=DB_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._wal_ready = False
+
+    def _connect(self):
+        # check_same_thread=False: a conexao passa de uma thread para outra entre
+        # requisicoes (nunca e usada por duas ao mesmo tempo)
+        conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = sqlite3.Row
+        if not self._wal_ready:
+            # journal_mode fica gravado no arquivo: basta na primeira conexao
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._wal_ready = True
+        for pragma in DB_PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        # Transacao esquecida aberta (ex.: HTTPException antes do commit) e desfeita
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        sqlite3.Connection.close(conn)
+
+    def close_all(self):
+        # No desligamento: a ultima conexao a fechar faz o checkpoint do WAL
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._closed = True
+        for conn in idle:
+            sqlite3.Connection.close(conn)
+
+db_pool = ConnectionPool(DB_PATH)
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    # Conexao do pool; conn.close() a devolve
+    return db_pool.acquire()
+
+DB_WRITER_BATCH = 64         # escritas no maximo por transacao do db_writer
+
+class DbWriter:
+    # Thread unica de escrita dos pedidos. O handler enfileira fn(cursor, *args) e espera
+    # o resultado num Future; a thread junta o que chegou na fila numa so transacao
+    # (group commit): um lock e um commit por lote em vez de um por requisicao, sem
+    # threads do FastAPI disputando o lock do arquivo. Leituras seguem pelo pool (WAL).
+    def __init__(self, pool, max_batch=DB_WRITER_BATCH):
+        self.pool = pool
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((fn, args, future))
+        return future
+
+    def run(self, fn, *args):
+        # Bloqueia ate o commit do lote; excecoes de fn (ex.: HTTPException) chegam ao chamador
+        return self.submit(fn, *args).result()
+
+    def stop(self):
+        # Grava o que ja estiver na fila e encerra a thread
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        conn = self.pool.acquire()
+        try:
+            stopping = False
+            while not stopping:
+                op = self._queue.get()
+                if op is None:
+                    break
+                batch = [op]
+                while len(batch) < self.max_batch:
+                    try:
+                        op = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is None:
+                        stopping = True
+                        break
+                    batch.append(op)
+                self._write_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn, batch):
+        cursor = conn.cursor()
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # SAVEPOINT por escrita: a que falhar e desfeita sozinha, o resto do lote segue
+                cursor.execute("SAVEPOINT db_write")
+                try:
+                    results.append((future, fn(cursor, *args), None))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO db_write")
+                    results.append((future, None, e))
+                cursor.execute("RELEASE db_write")
+            conn.commit()
+        except Exception as e:
+            # BEGIN/COMMIT falhou: nada do lote foi gravado
+            if conn.in_transaction:
+                conn.rollback()
+            for fn, args, future in batch:
+                if future.running():
+                    future.set_exception(e)
+            return
+        # Resultados so depois do commit: quem recebe a resposta ja ve o dado gravado
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+db_writer = DbWriter(db_pool)
+
+def save_customer_search_terms(cursor, customer_id, name, phone):
+    cursor.execute("DELETE FROM customer_search_terms WHERE customer_id = ?", (customer_id,))
+    cursor.executemany(
+        "INSERT OR IGNORE INTO customer_search_terms (term, customer_id) VALUES (?, ?)",
+        [(term, customer_id) for term in customer_search_terms(name, phone)]
+    )
+
+ORDER_JSON_FIELDS = ('items', 'salads', 'beverages', 'coffees', 'snacks', 'desserts', 'others')
+ORDER_EXTRA_FIELDS = ORDER_JSON_FIELDS[1:]
+
+def save_order_lines(cursor, order_id, created_at, items, extras):
+    # Copia normalizada das marmitas e extras do pedido (order_items, order_item_proteins,
+    # order_extras) para relatorios em SQL; roda na mesma transacao do INSERT em orders.
+    # items: lista de dicts como no JSON; extras: {categoria: [nomes]}
+    item_rows, protein_rows, extra_rows = [], [], []
+    for position, item in enumerate(items):
+        size = item.get('size')
+        item_rows.append((order_id, position, size, item.get('employee_name'), created_at))
+        proteins = item.get('proteins') or ([item['protein']] if item.get('protein') else [])
+        for slot, protein in enumerate(proteins):
+            protein_rows.append((order_id, position, slot, protein, size, created_at))
+    for category in ORDER_EXTRA_FIELDS:
+        for position, name in enumerate(extras.get(category) or []):
+            extra_rows.append((order_id, category, position, name, created_at))
+    cursor.executemany(
+        "INSERT OR REPLACE INTO order_items (order_id, position, size, employee_name, created_at) VALUES (?, ?, ?, ?, ?)",
+        item_rows
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO order_item_proteins (order_id, position, slot, protein, size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        protein_rows
+    )
+    cursor.executemany(
+        "INSERT OR REPLACE INTO order_extras (order_id, category, position, name, created_at) VALUES (?, ?, ?, ?, ?)",
+        extra_rows
+    )
+
+# Migracoes do esquema: cada funcao roda uma unica vez, em ordem, numa transacao.
+# PRAGMA user_version guarda no proprio arquivo quantas ja foram aplicadas, entao
+# as lojas instaladas recebem as mudancas na proxima abertura do sistema.
+# Nunca altere nem reordene uma migracao publicada: acrescente uma nova no fim.
+def migration_order_number_index(cursor):
+    # Numero de pedido unico; bancos antigos com duplicados ficam com indice simples
+    # (o MAX(order_number) de get_next_order_number usa qualquer um dos dois)
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_order_number ON orders(order_number)")
+    except sqlite3.IntegrityError:
+        print("[AVISO] Numeros de pedido duplicados no banco; indice unico nao criado")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_order_number ON orders(order_number)")
+
+def migration_customer_search_terms(cursor):
+    # Termos de busca de clientes (nome/telefone normalizados), indexados pela chave primaria
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customer_search_terms (
+            term TEXT NOT NULL,
+            customer_id TEXT NOT NULL,
+            PRIMARY KEY (term, customer_id)
+        ) WITHOUT ROWID
+    ''')
+    # Clientes cadastrados antes da busca indexada
+    cursor.execute('''
+        SELECT id, name, phone FROM customers
+        WHERE id NOT IN (SELECT customer_id FROM customer_search_terms)
+    ''')
+    for row in cursor.fetchall():
+        save_customer_search_terms(cursor, row['id'], row['name'], row['phone'])
+
+def migration_order_indexes(cursor):
+    # Listagem (ORDER BY created_at DESC), cozinha (status + data), relatorio por atendente
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status_created_at ON orders(status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_attendant_created_at ON orders(attendant_code, created_at)")
+
+def migration_product_indexes(cursor):
+    # Cardapio: produtos ativos por tipo
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_products_active_type ON products(active, type)")
+
+def migration_order_lines(cursor):
+    # Marmitas, proteinas e extras em tabelas proprias (ver save_order_lines). created_at e
+    # size sao repetidos nas linhas para os relatorios por periodo nao precisarem de JOIN.
+    # As linhas ficam aqui mesmo quando o pedido vai para o arquivo (orders_archive_AAAA_MM).
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_items (
+            order_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            size TEXT,
+            employee_name TEXT,
+            created_at TEXT,
+            PRIMARY KEY (order_id, position)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_item_proteins (
+            order_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            slot INTEGER NOT NULL,
+            protein TEXT NOT NULL,
+            size TEXT,
+            created_at TEXT,
+            PRIMARY KEY (order_id, position, slot)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS order_extras (
+            order_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            created_at TEXT,
+            PRIMARY KEY (order_id, category, position)
+        ) WITHOUT ROWID
+    ''')
+    # Indices cobrindo os relatorios: intervalo de datas + agrupamento, sem ler a tabela
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_items_created_at ON order_items(created_at, size)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_item_proteins_created_at ON order_item_proteins(created_at, protein, size)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_order_extras_created_at ON order_extras(created_at, category, name)")
+
+    # Pedidos ja gravados, inclusive os arquivados
+    tables = ['orders'] + [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders\\_archive\\_%' ESCAPE '\\' ORDER BY name"
+    ).fetchall()]
+    columns = ', '.join(('id', 'created_at') + ORDER_JSON_FIELDS)
+    for table in tables:
+        for row in cursor.execute(f"SELECT {columns} FROM {table}").fetchall():
+            decoded = {field: json.loads(row[field]) if row[field] else [] for field in ORDER_JSON_FIELDS}
+            save_order_lines(cursor, row['id'], row['created_at'], decoded['items'], decoded)
+
+def migration_order_counter(cursor):
+    # Contador persistente do numero do pedido (como db.counters no backend online): com o
+    # MAX(order_number) so da tabela orders, a numeracao voltava a 1 quando o arquivo
+    # levava os pedidos mais recentes (loja fechada por mais de ORDER_ARCHIVE_DAYS)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    ''')
+    tables = ['orders'] + [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders\\_archive\\_%' ESCAPE '\\'"
+    ).fetchall()]
+    last_number = 0
+    for table in tables:
+        last_number = max(last_number, cursor.execute(f"SELECT COALESCE(MAX(order_number), 0) FROM {table}").fetchone()[0])
+    cursor.execute("INSERT OR IGNORE INTO counters (name, seq) VALUES ('order_number', ?)", (last_number,))
+
+MIGRATIONS = [
+    migration_order_number_index,
+    migration_customer_search_terms,
+    migration_order_indexes,
+    migration_product_indexes,
+    migration_order_lines,
+    migration_order_counter,
+]
+
+def run_migrations(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        # user_version muda na mesma transacao: ou a migracao inteira entra, ou nada
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"[OK] Migracao {number} aplicada: {migration.__name__}")
 
 def init_db():
     conn = get_db()
@@ -110,6 +455,11 @@ def init_db():
         )
     ''')
     
+    conn.commit()
+    
+    # Indices e demais mudancas de esquema (ver MIGRATIONS)
+    run_migrations(conn)
+    
     # Create default admin user if not exists
     cursor.execute("SELECT * FROM users WHERE code = 'admin'")
     if not cursor.fetchone():
@@ -206,7 +556,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# Latencia por rota para o /metrics (por ultimo: mede tambem o CORS)
+app.add_middleware(MetricsMiddleware)
 
 api_router = APIRouter(prefix="/api")
 
@@ -216,13 +569,85 @@ def row_to_dict(row):
         return None
     return dict(row)
 
-def get_next_order_number():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT MAX(order_number) FROM orders")
-    result = cursor.fetchone()[0]
-    conn.close()
-    return (result or 0) + 1
+class SettingsCache:
+    # Configuracoes em memoria; update_settings invalida (write-through)
+    def __init__(self):
+        self._settings = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        settings = self._settings
+        if settings is not None:
+            return settings
+        with self._lock:
+            if self._settings is None:
+                conn = get_db()
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM settings WHERE id = 'settings'")
+                self._settings = row_to_dict(cursor.fetchone())
+                conn.close()
+            return self._settings
+
+    def invalidate(self):
+        with self._lock:
+            self._settings = None
+
+settings_cache = SettingsCache()
+
+# Colunas de orders na ordem da resposta (as mesmas chaves de order_from_row)
+ORDER_FIELDS = (
+    'id', 'order_number', 'customer_name', 'is_company_order', 'order_type', 'delivery_address',
+    'items', 'salads', 'beverages', 'coffees', 'snacks', 'desserts', 'others', 'observations',
+    'total_price', 'payment_method', 'amount_paid', 'change_amount', 'status',
+    'attendant_code', 'attendant_name', 'printed', 'created_at',
+)
+ORDER_SUMMARY_FIELDS = (
+    'id', 'order_number', 'customer_name', 'is_company_order', 'order_type', 'total_price',
+    'payment_method', 'status', 'attendant_code', 'attendant_name', 'printed', 'created_at',
+)
+ORDER_BOOL_FIELDS = ('is_company_order', 'printed')
+
+def order_json_sql(fields, extra=()):
+    # Expressao json_object() que monta o pedido no proprio SQLite (JSON1)
+    parts = []
+    for field in fields:
+        if field in ORDER_JSON_FIELDS:
+            # Texto ja gravado em JSON: json() embute sem reescrever; vazio/NULL vira []
+            expr = f"json(COALESCE(NULLIF({field}, ''), '[]'))"
+        elif field in ORDER_BOOL_FIELDS:
+            expr = f"json(CASE WHEN {field} THEN 'true' ELSE 'false' END)"
+        else:
+            expr = field
+        parts.append(f"'{field}', {expr}")
+    parts.extend(f"'{name}', {expr}" for name, expr in extra)
+    return f"json_object({', '.join(parts)})"
+
+ORDER_JSON_SELECT = {
+    "full": order_json_sql(ORDER_FIELDS),
+    "summary": order_json_sql(ORDER_SUMMARY_FIELDS, [
+        ("item_count", "json_array_length(COALESCE(NULLIF(items, ''), '[]'))"),
+    ]),
+}
+
+def order_from_row(row):
+    order = row_to_dict(row)
+    # Parse JSON fields
+    for field in ORDER_JSON_FIELDS:
+        order[field] = json.loads(order[field]) if order[field] else []
+    order['is_company_order'] = bool(order['is_company_order'])
+    order['printed'] = bool(order['printed'])
+    return order
+
+def get_next_order_number(cursor):
+    # Deve rodar na mesma conexao/transacao do INSERT (ver create_order). O contador
+    # (migration_order_counter) nao recua quando pedidos vao para o arquivo; o MAX de
+    # orders, pelo indice, so impede que ele fique abaixo de um numero ja gravado.
+    cursor.execute('''
+        UPDATE counters SET seq = MAX(seq, (SELECT COALESCE(MAX(order_number), 0) FROM orders)) + 1
+        WHERE name = 'order_number'
+    ''')
+    cursor.execute("SELECT seq FROM counters WHERE name = 'order_number'")
+    return cursor.fetchone()[0]
 
 # Auth endpoints
 @api_router.post("/auth/login")
@@ -343,6 +768,35 @@ def get_customers():
     conn.close()
     return customers
 
+@api_router.get("/customers/search")
+def search_customers(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(SEARCH_LIMIT_DEFAULT, ge=1, le=SEARCH_LIMIT_MAX),
+):
+    # Typeahead: prefixo de qualquer palavra do nome ou do telefone
+    key = search_key(q)
+    if not key:
+        return []
+    start, end = prefix_range(key)
+    
+    conn = get_db()
+    cursor = conn.cursor()
+    # Percorre so o trecho do indice com o prefixo; um cliente pode casar mais de um
+    # termo (palavras do nome, variantes do telefone), entao o LIMIT vale por cliente
+    cursor.execute('''
+        SELECT c.* FROM (
+            SELECT customer_id, MIN(term) AS term FROM customer_search_terms
+            WHERE term >= ? AND term < ?
+            GROUP BY customer_id
+            ORDER BY term
+            LIMIT ?
+        ) t
+        JOIN customers c ON c.id = t.customer_id
+    ''', (start, end, limit))
+    customers = [row_to_dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return sorted(customers, key=lambda c: c['name'])
+
 @api_router.post("/customers")
 def create_customer(customer: CustomerCreate):
     conn = get_db()
@@ -353,6 +807,7 @@ def create_customer(customer: CustomerCreate):
         INSERT INTO customers (id, name, phone, address, type, created_at)
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (customer_id, customer.name, customer.phone, customer.address, customer.type, datetime.now(timezone.utc).isoformat()))
+    save_customer_search_terms(cursor, customer_id, customer.name, customer.phone)
     conn.commit()
     conn.close()
     
@@ -363,41 +818,236 @@ def delete_customer(customer_id: str):
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
+    cursor.execute("DELETE FROM customer_search_terms WHERE customer_id = ?", (customer_id,))
     conn.commit()
     conn.close()
     return {"message": "Cliente removido"}
 
+# Arquivo de pedidos: finalizados ha mais de ORDER_ARCHIVE_DAYS dias vao para uma
+# tabela por mes (orders_archive_AAAA_MM); relatorios e exportacao leem o arquivo tambem
+ORDER_ARCHIVE_DAYS = int(os.environ.get('ORDER_ARCHIVE_DAYS', '30'))
+ARCHIVE_INTERVAL = 3600
+ARCHIVE_STATUSES = ('completed', 'delivered')
+ARCHIVE_PREFIX = 'orders_archive_'
+
+def order_columns(conn, table='orders'):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+def archive_tables(conn, date_from=None, date_to=None):
+    # Tabelas de arquivo com meses dentro de [date_from, date_to), em ordem cronologica
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'orders\\_archive\\_%' ESCAPE '\\' ORDER BY name"
+    ).fetchall()
+    first = ARCHIVE_PREFIX + date_from[:7].replace('-', '_') if date_from else None
+    last = ARCHIVE_PREFIX + date_to[:7].replace('-', '_') if date_to else None
+    return [
+        row[0] for row in rows
+        if (first is None or row[0] >= first) and (last is None or row[0] <= last)
+    ]
+
+def orders_source(conn, date_from=None, date_to=None):
+    # FROM para consultas que tambem leem o arquivo: "orders" ou um UNION ALL com os meses do periodo
+    tables = archive_tables(conn, date_from, date_to)
+    if not tables:
+        return "orders"
+    columns = ', '.join(order_columns(conn))
+    union = ' UNION ALL '.join(f"SELECT {columns} FROM {table}" for table in ['orders', *tables])
+    return f"({union}) AS orders"
+
+def ensure_archive_table(conn, table):
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} AS SELECT * FROM orders WHERE 0")
+    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_id ON {table}(id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)")
+    # Colunas novas em orders tambem entram no arquivo
+    existing = set(order_columns(conn, table))
+    for column in order_columns(conn):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+def archive_orders_once(now=None):
+    # Move os pedidos finalizados antigos, um mes por transacao; retorna quantos foram movidos
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=ORDER_ARCHIVE_DAYS)).isoformat()
+    statuses = ', '.join('?' for _ in ARCHIVE_STATUSES)
+    where = f"status IN ({statuses}) AND created_at < ? AND substr(created_at, 1, 7) = ?"
+    conn = get_db()
+    moved = 0
+    try:
+        months = [row[0] for row in conn.execute(
+            f"SELECT DISTINCT substr(created_at, 1, 7) FROM orders WHERE status IN ({statuses}) AND created_at < ?",
+            (*ARCHIVE_STATUSES, cutoff)
+        ) if row[0] and len(row[0]) == 7]
+        for month in months:
+            table = ARCHIVE_PREFIX + month.replace('-', '_')
+            params = (*ARCHIVE_STATUSES, cutoff, month)
+            conn.execute("BEGIN IMMEDIATE")
+            ensure_archive_table(conn, table)
+            columns = ', '.join(order_columns(conn))
+            conn.execute(f"INSERT OR REPLACE INTO {table} ({columns}) SELECT {columns} FROM orders WHERE {where}", params)
+            moved += conn.execute(f"DELETE FROM orders WHERE {where}", params).rowcount
+            conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        print(f"[AVISO] Arquivamento de pedidos falhou: {e}")
+    finally:
+        conn.close()
+    return moved
+
+class OrderArchiver:
+    # Roda archive_orders_once em uma thread de fundo a cada ARCHIVE_INTERVAL
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and ORDER_ARCHIVE_DAYS > 0:
+            self._thread = threading.Thread(target=self._run, name="order-archiver", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            archive_orders_once()
+            self._stop.wait(ARCHIVE_INTERVAL)
+
+order_archiver = OrderArchiver()
+
+def find_order_row(cursor, order_id):
+    # Pedido na tabela orders ou no arquivo (reimpressao de pedidos antigos)
+    cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
+    row = cursor.fetchone()
+    if row is None:
+        for table in reversed(archive_tables(cursor.connection)):
+            cursor.execute(f"SELECT * FROM {table} WHERE id = ?", (order_id,))
+            row = cursor.fetchone()
+            if row is not None:
+                break
+    return row
+
 # Orders endpoints
+def encode_order_cursor(order):
+    raw = json.dumps([order['created_at'], order['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_order_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Vem do cliente e vai para a consulta: so [texto, texto]
+        if not isinstance(values, list) or len(values) != 2 or not all(isinstance(v, str) for v in values):
+            raise ValueError(cursor)
+        created_at, order_id = values
+        return created_at, order_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor invalido")
+
 @api_router.get("/orders")
-def get_orders():
+def get_orders(
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    attendant_code: Optional[str] = None,
+    order_type: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    view: str = Query("full", pattern="^(full|summary)$"),
+):
+    # Filtros aplicados no SQL; paginacao por cursor sobre (created_at, id).
+    # view=summary traz so os campos das listas (sem itens/extras, com item_count).
+    # O JSON de cada pedido sai pronto do SQLite (json_object, ver ORDER_JSON_SELECT):
+    # os campos em JSON vao como estao gravados, sem json.loads/dumps no Python
+    conditions, params = order_filter_sql(status, date_from, date_to, attendant_code, order_type)
+    if cursor:
+        cursor_created_at, cursor_id = decode_order_cursor(cursor)
+        conditions.append("(created_at < ? OR (created_at = ? AND id < ?))")
+        params.extend([cursor_created_at, cursor_created_at, cursor_id])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM orders ORDER BY created_at DESC")
-    orders = []
-    for row in cursor.fetchall():
-        order = row_to_dict(row)
-        # Parse JSON fields
-        order['items'] = json.loads(order['items']) if order['items'] else []
-        order['salads'] = json.loads(order['salads']) if order['salads'] else []
-        order['beverages'] = json.loads(order['beverages']) if order['beverages'] else []
-        order['coffees'] = json.loads(order['coffees']) if order['coffees'] else []
-        order['snacks'] = json.loads(order['snacks']) if order['snacks'] else []
-        order['desserts'] = json.loads(order['desserts']) if order['desserts'] else []
-        order['others'] = json.loads(order['others']) if order['others'] else []
-        order['is_company_order'] = bool(order['is_company_order'])
-        order['printed'] = bool(order['printed'])
-        orders.append(order)
+    cursor_db = conn.cursor()
+    cursor_db.execute(
+        f"SELECT {ORDER_JSON_SELECT[view]}, created_at, id FROM orders {where} ORDER BY created_at DESC, id DESC LIMIT ?",
+        (*params, limit + 1)
+    )
+    rows = cursor_db.fetchall()
     conn.close()
-    return orders
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_order_cursor(rows[-1])
+
+    content = "[" + ",".join(row[0] for row in rows) + "]"
+    return Response(content=content, media_type="application/json", headers=headers)
+
+def order_filter_sql(status=None, date_from=None, date_to=None, attendant_code=None, order_type=None):
+    # Filtros comuns a listagem e a exportacao de pedidos
+    conditions = []
+    params = []
+    if status:
+        statuses = [s for s in status.split(",") if s]
+        conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+        params.extend(statuses)
+    if attendant_code:
+        conditions.append("attendant_code = ?")
+        params.append(attendant_code)
+    if order_type:
+        conditions.append("order_type = ?")
+        params.append(order_type)
+    if date_from:
+        conditions.append("created_at >= ?")
+        params.append(parse_report_date(date_from).isoformat())
+    if date_to:
+        conditions.append("created_at < ?")
+        params.append((parse_report_date(date_to) + timedelta(days=1)).isoformat())
+    return conditions, params
+
+@api_router.get("/orders/export")
+def export_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    attendant_code: Optional[str] = None,
+    order_type: Optional[str] = None,
+):
+    # Exporta pedidos (mais antigo primeiro) em NDJSON ou CSV, sem limite de linhas,
+    # lendo o SQLite em lotes de EXPORT_BATCH: primeiro os meses arquivados do periodo, depois orders
+    conditions, params = order_filter_sql(status, date_from, date_to, attendant_code, order_type)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def batches():
+        # O gerador roda depois que o handler ja retornou, e cada lote pode ser lido por
+        # uma thread diferente do threadpool: as conexoes do pool aceitam isso
+        conn = get_db()
+        try:
+            for table in [*archive_tables(conn, date_from, date_to), 'orders']:
+                cursor = conn.execute(f"SELECT * FROM {table} {where} ORDER BY created_at, id", params)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH)
+                    if not rows:
+                        break
+                    yield [order_from_row(row) for row in rows]
+        finally:
+            conn.close()
+
+    filename = export_filename(format, date_from, date_to)
+    return StreamingResponse(
+        iter_export(batches(), OrderExportEncoder(format)),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @api_router.post("/orders")
 def create_order(order: OrderCreate):
-    conn = get_db()
-    cursor = conn.cursor()
-    
     order_id = str(uuid.uuid4())
-    order_number = get_next_order_number()
-    
+    created_at = datetime.now(timezone.utc).isoformat()
+    # Gravado pelo db_writer: contador + INSERT na transacao da thread unica de escrita
+    order_number = db_writer.run(insert_order, order, order_id, created_at)
+    return {"id": order_id, "order_number": order_number, "message": "Pedido criado"}
+
+def insert_order(cursor, order, order_id, created_at):
+    order_number = get_next_order_number(cursor)
     cursor.execute('''
         INSERT INTO orders (id, order_number, customer_name, is_company_order, order_type, delivery_address,
                           items, salads, beverages, coffees, snacks, desserts, others, observations,
@@ -411,123 +1061,213 @@ def create_order(order: OrderCreate):
         json.dumps(order.snacks), json.dumps(order.desserts), json.dumps(order.others),
         order.observations, order.total_price, order.payment_method, order.amount_paid,
         order.change_amount, 'pending', order.attendant_code, order.attendant_name, 0,
-        datetime.now(timezone.utc).isoformat()
+        created_at
     ))
-    conn.commit()
-    conn.close()
-    
-    return {"id": order_id, "order_number": order_number, "message": "Pedido criado"}
+    save_order_lines(cursor, order_id, created_at, [item.dict() for item in order.items],
+                     {field: getattr(order, field) for field in ORDER_EXTRA_FIELDS})
+    return order_number
+
+def set_order_status(cursor, order_id, status):
+    cursor.execute("UPDATE orders SET status = ? WHERE id = ?", (status, order_id))
 
 @api_router.put("/orders/{order_id}/status")
 def update_order_status(order_id: str, update: OrderStatusUpdate):
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE orders SET status = ? WHERE id = ?", (update.status, order_id))
-    conn.commit()
-    conn.close()
+    db_writer.run(set_order_status, order_id, update.status)
     return {"message": "Status atualizado"}
 
 @api_router.patch("/orders/{order_id}/status")
 def patch_order_status(order_id: str, update: OrderStatusUpdate):
+    db_writer.run(set_order_status, order_id, update.status)
+    return {"message": "Status atualizado"}
+
+# Reports endpoints
+def parse_report_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data invalida: {value} (use AAAA-MM-DD)")
+
+def build_sales_report(start, end):
+    # created_at e gravado em ISO 8601 (UTC), entao o intervalo vira comparacao de texto
+    date_from = start.isoformat()
+    date_to = (end + timedelta(days=1)).isoformat()
+    where = "created_at >= ? AND created_at < ?"
+    params = (date_from, date_to)
+
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("UPDATE orders SET status = ? WHERE id = ?", (update.status, order_id))
-    conn.commit()
+    # "orders" ou um UNION ALL com os meses arquivados do periodo
+    orders = orders_source(conn, date_from, end.isoformat())
+
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(total_price), 0) FROM {orders} WHERE {where}", params)
+    total_orders, total_revenue = cursor.fetchone()
+
+    cursor.execute(f"SELECT status, COUNT(*) FROM {orders} WHERE {where} GROUP BY status", params)
+    status_counts = {row[0]: row[1] for row in cursor.fetchall()}
+
+    marmitas_by_size = marmitas_by_size_sql(cursor, where, params)
+
+    cursor.execute(f'''
+        SELECT COALESCE(attendant_name, 'Desconhecido'), COUNT(*), SUM(total_price)
+        FROM {orders} WHERE {where} GROUP BY 1 ORDER BY 3 DESC
+    ''', params)
+    sales_by_attendant = [
+        {"attendant_name": row[0], "count": row[1], "total": round(row[2] or 0, 2)}
+        for row in cursor.fetchall()
+    ]
+
+    cursor.execute(f'''
+        SELECT COALESCE(payment_method, 'DINHEIRO'), COUNT(*), SUM(total_price)
+        FROM {orders} WHERE {where} GROUP BY 1 ORDER BY 3 DESC
+    ''', params)
+    sales_by_payment = [
+        {"payment_method": row[0], "count": row[1], "total": round(row[2] or 0, 2)}
+        for row in cursor.fetchall()
+    ]
+
+    cursor.execute(f'''
+        SELECT substr(created_at, 1, 10), COUNT(*), SUM(total_price)
+        FROM {orders} WHERE {where} GROUP BY 1 ORDER BY 1
+    ''', params)
+    days = [
+        {"date": row[0], "count": row[1], "total": round(row[2] or 0, 2)}
+        for row in cursor.fetchall()
+    ]
     conn.close()
-    return {"message": "Status atualizado"}
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total_orders": total_orders,
+        "total_revenue": round(total_revenue, 2),
+        "status_counts": status_counts,
+        "marmitas_by_size": marmitas_by_size,
+        "sales_by_attendant": sales_by_attendant,
+        "sales_by_payment": sales_by_payment,
+        "days": days,
+    }
+
+def marmitas_by_size_sql(cursor, where, params):
+    # order_items ja inclui os pedidos arquivados (indice em created_at, size)
+    marmitas_by_size = {"P": 0, "M": 0, "G": 0}
+    cursor.execute(f"SELECT size, COUNT(*) FROM order_items WHERE {where} GROUP BY size", params)
+    for size, count in cursor.fetchall():
+        if size:
+            marmitas_by_size[size] = count
+    return marmitas_by_size
+
+def build_product_mix_report(start, end):
+    # Mix de produtos do periodo direto das tabelas normalizadas (ver save_order_lines)
+    params = (start.isoformat(), (end + timedelta(days=1)).isoformat())
+    where = "created_at >= ? AND created_at < ?"
+
+    conn = get_db()
+    cursor = conn.cursor()
+    marmitas_by_size = marmitas_by_size_sql(cursor, where, params)
+
+    proteins = {}
+    cursor.execute(f'''
+        SELECT protein, size, COUNT(*) FROM order_item_proteins
+        WHERE {where} GROUP BY protein, size
+    ''', params)
+    for protein, size, count in cursor.fetchall():
+        entry = proteins.setdefault(protein, {"protein": protein, "count": 0, "by_size": {"P": 0, "M": 0, "G": 0}})
+        entry["count"] += count
+        if size:
+            entry["by_size"][size] = entry["by_size"].get(size, 0) + count
+
+    extras = {category: [] for category in ORDER_EXTRA_FIELDS}
+    cursor.execute(f'''
+        SELECT category, name, COUNT(*) FROM order_extras
+        WHERE {where} GROUP BY category, name ORDER BY category, 3 DESC
+    ''', params)
+    for category, name, count in cursor.fetchall():
+        extras.setdefault(category, []).append({"name": name, "count": count})
+    conn.close()
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "marmitas_by_size": marmitas_by_size,
+        "proteins": sorted(proteins.values(), key=lambda p: p["count"], reverse=True),
+        "extras": extras,
+    }
+
+@api_router.get("/reports/daily")
+def get_daily_report(date: Optional[str] = None):
+    day = parse_report_date(date) if date else datetime.now(timezone.utc).date()
+    return build_sales_report(day, day)
+
+@api_router.get("/reports/range")
+def get_range_report(start: str, end: str):
+    start_day = parse_report_date(start)
+    end_day = parse_report_date(end)
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="Data final anterior a data inicial")
+    return build_sales_report(start_day, end_day)
+
+@api_router.get("/reports/products")
+def get_product_mix_report(start: str, end: str):
+    # Quantas marmitas de cada tamanho, proteinas (por tamanho) e extras no intervalo
+    start_day = parse_report_date(start)
+    end_day = parse_report_date(end)
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="Data final anterior a data inicial")
+    return build_product_mix_report(start_day, end_day)
 
 @api_router.get("/orders/{order_id}/receipt")
 def get_order_receipt(order_id: str):
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-    row = cursor.fetchone()
+    row = find_order_row(cursor, order_id)
     if not row:
         conn.close()
         raise HTTPException(status_code=404, detail="Pedido nao encontrado")
     
-    order = row_to_dict(row)
-    order['items'] = json.loads(order['items']) if order['items'] else []
-    
-    cursor.execute("SELECT * FROM settings WHERE id = 'settings'")
-    settings = row_to_dict(cursor.fetchone())
+    order = order_from_row(row)
     conn.close()
     
-    receipt = generate_receipt(order, settings)
+    settings = settings_cache.get()
+    
+    receipt = receipt_layout(settings).order_text(order)
     return {"receipt": receipt, "order_number": order['order_number']}
 
 @api_router.post("/orders/{order_id}/print")
 def print_order(order_id: str):
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-    row = cursor.fetchone()
+    row = find_order_row(cursor, order_id)
     if not row:
         conn.close()
         raise HTTPException(status_code=404, detail="Pedido nao encontrado")
     
-    order = row_to_dict(row)
-    order['items'] = json.loads(order['items']) if order['items'] else []
-    
-    cursor.execute("SELECT * FROM settings WHERE id = 'settings'")
-    settings = row_to_dict(cursor.fetchone())
-    
-    cursor.execute("UPDATE orders SET printed = 1 WHERE id = ?", (order_id,))
-    conn.commit()
+    order = order_from_row(row)
     conn.close()
+    settings = settings_cache.get()
+    
+    db_writer.run(mark_order_printed, order_id)
     
-    receipt = generate_receipt(order, settings)
+    receipt = receipt_layout(settings).order_text(order)
     
     # Try to print
+    start = time.perf_counter()
     try:
         print_to_windows(receipt)
-        return {"message": "Impresso com sucesso", "receipt": receipt}
     except Exception as e:
+        printer_send_duration.observe(time.perf_counter() - start, "windows", "error")
+        printer_failures.inc("windows")
+        printer_jobs.inc("windows", "failed")
         return {"message": f"Cupom gerado (impressao falhou: {str(e)})", "receipt": receipt}
+    printer_send_duration.observe(time.perf_counter() - start, "windows", "ok")
+    printer_jobs.inc("windows", "done")
+    return {"message": "Impresso com sucesso", "receipt": receipt}
 
-def generate_receipt(order, settings):
-    lines = []
-    lines.append("=" * 40)
-    lines.append(settings['store_name'].center(40))
-    lines.append(settings['store_address'].center(40))
-    lines.append("=" * 40)
-    lines.append(f"Pedido: #{order['order_number']}")
-    lines.append(f"Cliente: {order['customer_name']}")
-    lines.append(f"Tipo: {order['order_type']}")
-    
-    if order['order_type'] == 'ENTREGA' and order.get('delivery_address'):
-        lines.append(f"Endereco: {order['delivery_address']}")
-    
-    lines.append("-" * 40)
-    
-    for idx, item in enumerate(order['items'], 1):
-        lines.append(f"\nMarmita {idx} ({item['size']}):")
-        if item.get('employee_name'):
-            lines.append(f"  Para: {item['employee_name']}")
-        proteins = item.get('proteins', [item.get('protein', '')])
-        if isinstance(proteins, list) and proteins:
-            lines.append(f"  Mistura: {' + '.join([p for p in proteins if p])}")
-        elif proteins:
-            lines.append(f"  Mistura: {proteins}")
-        if item.get('accompaniments'):
-            lines.append(f"  Acomp.: {', '.join(item['accompaniments'])}")
-    
-    lines.append("-" * 40)
-    lines.append(f"TOTAL: R$ {order['total_price']:.2f}")
-    lines.append(f"Pagamento: {order.get('payment_method', 'DINHEIRO')}")
-    
-    if order.get('payment_method') == 'DINHEIRO' and order.get('amount_paid', 0) > 0:
-        lines.append(f"Recebido: R$ {order['amount_paid']:.2f}")
-        lines.append(f"TROCO: R$ {order.get('change_amount', 0):.2f}")
-    
-    lines.append("-" * 40)
-    lines.append(f"Atendente: {order['attendant_name']}")
-    lines.append(f"Data: {order['created_at'][:19]}")
-    lines.append("=" * 40)
-    lines.append("   Obrigado pela preferencia!")
-    lines.append("=" * 40)
-    
-    return "\n".join(lines)
+def mark_order_printed(cursor, order_id):
+    cursor.execute("UPDATE orders SET printed = 1 WHERE id = ?", (order_id,))
+
+def receipt_layout(settings):
+    # Layout compartilhado com o backend online (backend/receipt_engine.py)
+    return receipt_engine.layout(settings['store_name'], settings['store_address'])
 
 def print_to_windows(text):
     import tempfile
@@ -548,12 +1288,8 @@ def print_to_windows(text):
 # Settings endpoints
 @api_router.get("/settings")
 def get_settings():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM settings WHERE id = 'settings'")
-    settings = row_to_dict(cursor.fetchone())
-    conn.close()
-    return settings
+    settings = settings_cache.get()
+    return dict(settings) if settings else None
 
 @api_router.put("/settings")
 def update_settings(settings: SettingsUpdate):
@@ -566,6 +1302,7 @@ def update_settings(settings: SettingsUpdate):
           settings.logo_url, settings.printer_type, settings.printer_ip))
     conn.commit()
     conn.close()
+    settings_cache.invalidate()
     return {"message": "Configuracoes atualizadas"}
 
 # Health check
@@ -573,19 +1310,35 @@ def update_settings(settings: SettingsUpdate):
 def health():
     return {"status": "online", "message": "Dona Guedes API"}
 
+# Metricas no formato do Prometheus (antes da rota catch-all do frontend)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.on_event("startup")
+def start_background_jobs():
+    order_archiver.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    order_archiver.stop()
+    db_writer.stop()
+    db_pool.close_all()
+
 app.include_router(api_router)
 
 # Serve static files (compiled frontend)
+# Indice em memoria com variantes .br/.gz, ETag e cache imutavel (ver static_assets.py)
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(STATIC_DIR):
-    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    static_assets = StaticAssets(STATIC_DIR)
     
-    @app.get("/{full_path:path}")
-    def serve_frontend(full_path: str):
-        file_path = os.path.join(STATIC_DIR, full_path)
-        if os.path.exists(file_path) and os.path.isfile(file_path):
-            return FileResponse(file_path)
-        return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+    @app.get("/{full_path:path}", include_in_schema=False)
+    async def serve_frontend(full_path: str, request: Request):
+        # async: so le o dicionario em memoria, sem passar pelo threadpool
+        return static_assets.response(
+            full_path, request.headers.get("accept-encoding", ""), request.headers.get("if-none-match")
+        )
 
 if __name__ == "__main__":
     import uvicorn
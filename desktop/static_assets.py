@@ -0,0 +1,155 @@
+"""
+Frontend compilado (React) servido da memória pelo servidor offline
+Na inicialização, todos os arquivos da pasta static entram num índice em memória
+com ETag e as variantes comprimidas. A rota catch-all só consulta o dicionário:
+não há os.path.exists/isfile nem leitura de disco por requisição.
+- .br/.gz gerados no build (precompress_directory, chamado por build_exe.py e
+  build_installer.py) são servidos conforme o Accept-Encoding. Sem eles, o gzip
+  é feito uma vez, ao carregar.
+- Arquivos com hash no nome (main.1c250c6a.css) nunca mudam: cache "immutable"
+  de um ano. index.html e os demais são revalidados pelo ETag (304 sem corpo).
+Cada terminal baixa o bundle uma vez por versão, e comprimido.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from fastapi.responses import Response
+
+try:
+    import brotli  # só no build; em execução os .br já vêm prontos
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = {".html", ".js", ".css", ".json", ".map", ".svg", ".txt", ".xml", ".ico", ".webmanifest"}
+MIN_COMPRESS_SIZE = 1024     # abaixo disso o ganho não compensa os cabeçalhos
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+ENCODING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+ENCODING_PREFERENCE = ("br", "gzip")
+# No Windows, mimetypes lê o registro, que às vezes diz text/plain para .js
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".map": "application/json; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".txt": "text/plain; charset=utf-8",
+    ".ico": "image/x-icon",
+    ".png": "image/png",
+    ".webmanifest": "application/manifest+json",
+}
+
+
+def compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE
+
+
+def precompress_directory(directory: str) -> int:
+    """Grava .gz (e .br, com o pacote brotli) ao lado de cada arquivo comprimível; retorna quantos"""
+    count = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith((".gz", ".br")) or not compressible(name) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, body in variants.items():
+                if len(body) < len(data):
+                    with open(path + suffix, "wb") as f:
+                        f.write(body)
+            count += 1
+    return count
+
+
+def parse_accept_encoding(header: str) -> set:
+    """Codificações aceitas (as com q=0 ficam de fora)"""
+    accepted = set()
+    for part in header.split(","):
+        token, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if token and quality > 0:
+            accepted.add(token.lower())
+    return accepted
+
+
+class Asset:
+    __slots__ = ("body", "variants", "etag", "content_type", "cache_control")
+
+    def __init__(self, body: bytes, variants: Dict[str, bytes], content_type: str, cache_control: str):
+        self.body = body
+        self.variants = variants
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.content_type = content_type
+        self.cache_control = cache_control
+
+
+class StaticAssets:
+    def __init__(self, directory: str, index: str = "index.html"):
+        self.directory = directory
+        self.index = index
+        self.assets: Dict[str, Asset] = {}
+        self.load()
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                assets[key] = self._load_asset(path, key)
+        self.assets = assets
+
+    def _load_asset(self, path: str, key: str) -> Asset:
+        with open(path, "rb") as f:
+            body = f.read()
+        variants = {}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            if os.path.exists(path + suffix):
+                with open(path + suffix, "rb") as f:
+                    variants[encoding] = f.read()
+        if "gzip" not in variants and compressible(path) and len(body) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(body, compresslevel=6, mtime=0)
+            if len(compressed) < len(body):
+                variants["gzip"] = compressed
+        content_type = (CONTENT_TYPES.get(os.path.splitext(path)[1].lower())
+                        or mimetypes.guess_type(path)[0] or "application/octet-stream")
+        cache_control = CACHE_IMMUTABLE if HASHED_NAME.search(os.path.basename(key)) else CACHE_REVALIDATE
+        return Asset(body, variants, content_type, cache_control)
+
+    def response(self, path: str, accept_encoding: str = "", if_none_match: Optional[str] = None) -> Response:
+        """Arquivo pedido ou, para rotas do React (ex.: /cozinha), o index.html"""
+        asset = self.assets.get(path) or self.assets.get(self.index)
+        if asset is None:
+            return Response(status_code=404)
+
+        accepted = parse_accept_encoding(accept_encoding) if asset.variants else set()
+        encoding = next((e for e in ENCODING_PREFERENCE if e in accepted and e in asset.variants), None)
+        # ETag por variante: caches intermediários não misturam corpo comprimido e puro
+        etag = asset.etag if encoding is None else f'{asset.etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+
+        if if_none_match and (if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(content=asset.variants[encoding], media_type=asset.content_type, headers=headers)
+        return Response(content=asset.body, media_type=asset.content_type, headers=headers)
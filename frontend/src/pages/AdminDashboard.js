@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { axiosInstance } from "../App";
+import { axiosInstance, API } from "../App";
 import { Button } from "../components/ui/button";
 import { Input } from "../components/ui/input";
 import { Textarea } from "../components/ui/textarea";
@@ -19,6 +19,7 @@ export default function AdminDashboard({ user, onLogout }) {
   const [customers, setCustomers] = useState([]);
   const [settings, setSettings] = useState({});
   const [orders, setOrders] = useState([]);
+  const [report, setReport] = useState(null);
   const [selectedDate, setSelectedDate] = useState(new Date().toISOString().split('T')[0]);
   const [loading, setLoading] = useState(false);
 
@@ -41,8 +42,12 @@ export default function AdminDashboard({ user, onLogout }) {
         const res = await axiosInstance.get("/settings");
         setSettings(res.data);
       } else if (view === "reports") {
-        const res = await axiosInstance.get("/orders");
-        setOrders(res.data);
+        const [reportRes, ordersRes] = await Promise.all([
+          axiosInstance.get("/reports/daily", { params: { date: selectedDate } }),
+          axiosInstance.get("/orders", { params: { date_from: selectedDate, date_to: selectedDate, view: "summary" } }),
+        ]);
+        setReport(reportRes.data);
+        setOrders(ordersRes.data);
       }
     } catch (error) {
       toast.error("Erro ao carregar dados");
@@ -179,7 +184,7 @@ export default function AdminDashboard({ user, onLogout }) {
         {view === "products" && <ProductsTab products={products} onRefresh={loadData} />}
         {view === "customers" && <CustomersTab customers={customers} onRefresh={loadData} />}
         {view === "users" && <UsersTab users={users} onDelete={deleteUser} onRefresh={loadData} />}
-        {view === "reports" && <ReportsTab orders={orders} products={products} selectedDate={selectedDate} setSelectedDate={setSelectedDate} />}
+        {view === "reports" && <ReportsTab orders={orders} report={report} products={products} selectedDate={selectedDate} setSelectedDate={setSelectedDate} />}
         {view === "settings" && <SettingsTab settings={settings} setSettings={setSettings} onSubmit={updateSettings} loading={loading} />}
       </div>
     </div>
@@ -1063,39 +1068,33 @@ function SettingsTab({ settings, setSettings, onSubmit, loading }) {
 }
 
 
-function ReportsTab({ orders, products, selectedDate, setSelectedDate }) {
+function ReportsTab({ orders, report, products, selectedDate, setSelectedDate }) {
   // Filtrar pedidos do dia selecionado
   const filteredOrders = orders.filter(order => {
     const orderDate = new Date(order.created_at).toISOString().split('T')[0];
     return orderDate === selectedDate;
   });
 
-  // Calcular totais
-  const totalOrders = filteredOrders.length;
-  const totalRevenue = filteredOrders.reduce((sum, order) => sum + (order.total_price || 0), 0);
-  const completedOrders = filteredOrders.filter(o => o.status === "completed").length;
-  const pendingOrders = filteredOrders.filter(o => o.status === "pending").length;
-  const preparingOrders = filteredOrders.filter(o => o.status === "preparing").length;
+  // Totais calculados no servidor (/reports/daily)
+  const statusCounts = report?.status_counts || {};
+  const totalOrders = report?.total_orders || 0;
+  const totalRevenue = report?.total_revenue || 0;
+  const completedOrders = statusCounts.completed || 0;
+  const pendingOrders = statusCounts.pending || 0;
+  const preparingOrders = statusCounts.preparing || 0;
 
   // Contar marmitas por tamanho
-  const marmitasBySize = { P: 0, M: 0, G: 0 };
-  filteredOrders.forEach(order => {
-    (order.items || []).forEach(item => {
-      if (item.size && marmitasBySize[item.size] !== undefined) {
-        marmitasBySize[item.size]++;
-      }
-    });
-  });
+  const marmitasBySize = report?.marmitas_by_size || { P: 0, M: 0, G: 0 };
+
+  // Exportação (CSV em streaming no servidor): dia selecionado ou mês até o dia
+  const monthStart = selectedDate.slice(0, 8) + "01";
+  const exportUrl = (dateFrom) =>
+    `${API}/orders/export?format=csv&date_from=${dateFrom}&date_to=${selectedDate}`;
 
   // Vendas por atendente
   const salesByAttendant = {};
-  filteredOrders.forEach(order => {
-    const name = order.attendant_name || "Desconhecido";
-    if (!salesByAttendant[name]) {
-      salesByAttendant[name] = { count: 0, total: 0 };
-    }
-    salesByAttendant[name].count++;
-    salesByAttendant[name].total += order.total_price || 0;
+  (report?.sales_by_attendant || []).forEach(row => {
+    salesByAttendant[row.attendant_name] = { count: row.count, total: row.total };
   });
 
   return (
@@ -1115,6 +1114,14 @@ function ReportsTab({ orders, products, selectedDate, setSelectedDate }) {
           <span className="text-sm text-secondary-light">
             {new Date(selectedDate + 'T12:00:00').toLocaleDateString('pt-BR', { weekday: 'long', day: 'numeric', month: 'long', year: 'numeric' })}
           </span>
+          <div className="ml-auto flex gap-2">
+            <a href={exportUrl(selectedDate)} download data-testid="export-day-csv">
+              <Button variant="outline">Exportar dia (CSV)</Button>
+            </a>
+            <a href={exportUrl(monthStart)} download data-testid="export-month-csv">
+              <Button variant="outline">Exportar mes (CSV)</Button>
+            </a>
+          </div>
         </div>
       </div>
 
@@ -1204,7 +1211,7 @@ function ReportsTab({ orders, products, selectedDate, setSelectedDate }) {
                 <div className="text-sm text-secondary-light">
                   <span>{order.order_type}</span>
                   <span className="mx-2">|</span>
-                  <span>{(order.items || []).length} marmita(s)</span>
+                  <span>{order.item_count ?? (order.items || []).length} marmita(s)</span>
                   <span className="mx-2">|</span>
                   <span>{new Date(order.created_at).toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })}</span>
                   <span className="mx-2">|</span>
@@ -21,7 +21,7 @@ const ORDER_TYPES = [
 export default function AttendantDashboard({ user, onLogout }) {
   const [view, setView] = useState("new");
   const [products, setProducts] = useState([]);
-  const [customers, setCustomers] = useState([]);
+  const [filteredCustomers, setFilteredCustomers] = useState([]);
   const [myOrders, setMyOrders] = useState([]);
   
   // Order form state
@@ -59,7 +59,6 @@ export default function AttendantDashboard({ user, onLogout }) {
 
   useEffect(() => {
     loadProducts();
-    loadCustomers();
     if (view === "orders") {
       loadMyOrders();
     }
@@ -74,20 +73,36 @@ export default function AttendantDashboard({ user, onLogout }) {
     }
   };
 
-  const loadCustomers = async () => {
-    try {
-      const response = await axiosInstance.get("/customers");
-      setCustomers(response.data);
-    } catch (error) {
-      console.error("Erro ao carregar clientes");
+  // Typeahead: busca no servidor (índice por prefixo) em vez de baixar todos os clientes
+  useEffect(() => {
+    const query = customerName.trim();
+    if (!showCustomerSuggestions || !query) {
+      setFilteredCustomers([]);
+      return;
     }
-  };
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await axiosInstance.get("/customers/search", {
+          params: { q: query, limit: 5 },
+        });
+        if (!cancelled) setFilteredCustomers(response.data);
+      } catch (error) {
+        console.error("Erro ao buscar clientes");
+      }
+    }, 150);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [customerName, showCustomerSuggestions]);
 
   const loadMyOrders = async () => {
     try {
-      const response = await axiosInstance.get("/orders");
-      const filtered = response.data.filter(o => o.attendant_code === user.code);
-      setMyOrders(filtered);
+      const response = await axiosInstance.get("/orders", {
+        params: { attendant_code: user.code },
+      });
+      setMyOrders(response.data);
     } catch (error) {
       toast.error("Erro ao carregar pedidos");
     }
@@ -157,10 +172,6 @@ export default function AttendantDashboard({ user, onLogout }) {
     setShowCustomerSuggestions(false);
   };
 
-  const filteredCustomers = customers.filter(c => 
-    c.name.toLowerCase().includes(customerName.toLowerCase())
-  ).slice(0, 5);
-
   const calculateTotal = () => {
     let total = 0;
     
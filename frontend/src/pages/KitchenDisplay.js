@@ -1,9 +1,11 @@
 import { useState, useEffect } from "react";
-import { axiosInstance } from "../App";
+import { axiosInstance, API } from "../App";
 import { Button } from "../components/ui/button";
 import { toast } from "sonner";
 import { ChefHat, Clock, PlayCircle, CheckCircle, RefreshCw } from "lucide-react";
 
+const ACTIVE_STATUSES = ["pending", "preparing", "ready"];
+
 const STATUS_CONFIG = {
   pending: { label: "Pendente", color: "bg-orange-100 border-primary", icon: Clock, textColor: "text-primary" },
   preparing: { label: "Preparando", color: "bg-blue-100 border-accent-blue", icon: PlayCircle, textColor: "text-accent-blue" },
@@ -15,16 +17,50 @@ export default function KitchenDisplay() {
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
-    loadOrders();
-    const interval = setInterval(loadOrders, 5000); // Auto refresh every 5s
-    return () => clearInterval(interval);
+    let interval = null;
+    const startPolling = () => {
+      if (interval) return;
+      loadOrders();
+      interval = setInterval(loadOrders, 5000); // Auto refresh every 5s
+    };
+
+    if (!window.EventSource) {
+      startPolling();
+      return () => clearInterval(interval);
+    }
+
+    // Pedidos chegam por push (SSE); sem stream no servidor, volta ao polling
+    const source = new EventSource(`${API}/orders/stream?status=${ACTIVE_STATUSES.join(",")}`);
+    source.addEventListener("snapshot", (e) => setOrders(JSON.parse(e.data)));
+    source.addEventListener("order_created", (e) => applyOrderEvent(JSON.parse(e.data)));
+    source.addEventListener("order_updated", (e) => applyOrderEvent(JSON.parse(e.data)));
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) startPolling();
+    };
+
+    return () => {
+      source.close();
+      clearInterval(interval);
+    };
   }, []);
 
+  const applyOrderEvent = (order) => {
+    setOrders((current) => {
+      const others = current.filter((o) => o.id !== order.id);
+      if (!ACTIVE_STATUSES.includes(order.status)) return others;
+      const exists = others.length !== current.length;
+      return exists
+        ? current.map((o) => (o.id === order.id ? order : o))
+        : [order, ...current];
+    });
+  };
+
   const loadOrders = async () => {
     try {
-      const response = await axiosInstance.get("/orders");
-      const filtered = response.data.filter(o => ["pending", "preparing", "ready"].includes(o.status));
-      setOrders(filtered);
+      const response = await axiosInstance.get("/orders", {
+        params: { status: ACTIVE_STATUSES.join(",") },
+      });
+      setOrders(response.data);
     } catch (error) {
       console.error("Erro ao carregar pedidos");
     }
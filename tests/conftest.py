@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Os módulos do backend são importados pelo nome, como server.py faz
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND_DIR)
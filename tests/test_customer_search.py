@@ -0,0 +1,52 @@
+"""
+Typeahead de clientes do backend online (GET /api/customers/search) sobre o
+mongomock: com mais clientes no prefixo do que o limit, vêm os primeiros por nome.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from customer_search import search_fields
+
+NAMES = ["Maria Zilda", "Maria Bia", "Marcos", "Mario Ana", "Marta", "Ana Maria", "Joana"]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "test_customer_search")
+    import server
+    db = AsyncMongoMockClient()["test_customer_search"]
+    monkeypatch.setattr(server, "db", db)
+
+    async def seed():
+        await db.customers.create_index([("search_terms", 1)], name="search_terms")
+        for name in NAMES:
+            doc = {"id": str(uuid.uuid4()), "name": name, "phone": None, "address": None}
+            await db.customers.insert_one({**doc, **search_fields(doc)})
+
+    asyncio.run(seed())
+    return server
+
+
+def search(server, q, limit):
+    response = asyncio.run(server.search_customers(q=q, limit=limit))
+    return [customer["name"] for customer in json.loads(response.body)]
+
+
+def test_limit_keeps_the_first_matches_by_name(server):
+    assert search(server, "mar", 3) == ["Ana Maria", "Marcos", "Maria Bia"]
+
+
+def test_results_are_stable_between_calls(server):
+    first = search(server, "mar", 2)
+    assert all(search(server, "mar", 2) == first for _ in range(5))
+
+
+def test_search_returns_every_match_under_the_limit(server):
+    assert search(server, "mar", 20) == ["Ana Maria", "Marcos", "Maria Bia", "Maria Zilda", "Mario Ana", "Marta"]
@@ -0,0 +1,172 @@
+"""
+Verificação da licença em segundo plano (license_manager.py) contra um servidor
+de licenças local: o mesmo GET /api/check do license-server, num thread.
+"""
+
+import asyncio
+import json
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import license_manager as lm
+
+EXPIRES_AT = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+
+
+class FakeLicenseServer:
+    """Responde /api/check com `self.license` e conta as requisições"""
+
+    def __init__(self):
+        self.license = {"status": "active", "expires_at": EXPIRES_AT}
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps(server.license).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class StopLoop(BaseException):
+    """Interrompe run_refresher (BaseException: o loop só captura Exception)"""
+
+
+@pytest.fixture
+def license_server(monkeypatch):
+    server = FakeLicenseServer()
+    monkeypatch.setattr(lm, "LICENSE_SERVER", server.url)
+    yield server
+    server.close()
+
+
+def closed_port_url():
+    """Porta livre e fechada: a conexão é recusada na hora"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def unreachable_server(monkeypatch):
+    monkeypatch.setattr(lm, "LICENSE_SERVER", closed_port_url())
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Licença ativa com a última verificação vencida, gravada num .license temporário"""
+    monkeypatch.setattr(lm, "LICENSE_FILE", tmp_path / ".license")
+    manager = lm.LicenseManager()
+    manager.license_data = {
+        "license_key": "KEY-1",
+        "client_name": "Dona Guedes",
+        "status": "active",
+        "expires_at": EXPIRES_AT,
+        "last_check": (datetime.now(timezone.utc) - timedelta(days=2)).isoformat(),
+    }
+    manager._save_license()
+    return manager
+
+
+def record_sleeps(monkeypatch, limit, on_sleep=None):
+    """Troca asyncio.sleep do módulo: anota os atrasos e para o loop depois de `limit`"""
+    delays = []
+
+    async def fake_sleep(seconds):
+        delays.append(seconds)
+        if on_sleep:
+            on_sleep(len(delays))
+        if len(delays) >= limit:
+            raise StopLoop()
+
+    monkeypatch.setattr(lm.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def run_refresher(manager):
+    with pytest.raises(StopLoop):
+        asyncio.run(manager.run_refresher())
+
+
+def test_refresher_backs_off_while_server_is_unreachable(manager, unreachable_server, monkeypatch):
+    delays = record_sleeps(monkeypatch, limit=9)
+    run_refresher(manager)
+
+    assert delays == [60, 120, 240, 480, 960, 1920, 3600, 3600, 3600]
+    # Sem resposta, a licença local continua valendo
+    assert manager.check_license()[0] is True
+
+
+def test_refresher_waits_24h_once_the_server_answers(manager, unreachable_server, monkeypatch):
+    server = FakeLicenseServer()
+    try:
+        def on_sleep(count):
+            if count == 3:
+                monkeypatch.setattr(lm, "LICENSE_SERVER", server.url)
+
+        delays = record_sleeps(monkeypatch, limit=4, on_sleep=on_sleep)
+        run_refresher(manager)
+    finally:
+        server.close()
+
+    assert delays[:3] == [60, 120, 240]
+    assert server.requests == 1
+    # Depois da resposta, a próxima verificação é em 24h
+    assert delays[3] == pytest.approx(lm.CHECK_INTERVAL.total_seconds(), abs=5)
+
+
+def test_license_file_is_rewritten_only_when_status_or_expiry_changes(manager, license_server):
+    path = lm.LICENSE_FILE
+    saved = path.read_text()
+    mtime = path.stat().st_mtime_ns
+
+    asyncio.run(manager._check_online())
+    assert license_server.requests == 1
+    assert path.read_text() == saved
+    assert path.stat().st_mtime_ns == mtime
+    # last_check só muda em memória
+    assert manager.license_data["last_check"] != json.loads(saved)["last_check"]
+
+    new_expiry = (datetime.now(timezone.utc) + timedelta(days=60)).isoformat()
+    license_server.license = {"status": "active", "expires_at": new_expiry}
+    asyncio.run(manager._check_online())
+    assert json.loads(path.read_text())["expires_at"] == new_expiry
+
+    license_server.license = {"status": "blocked", "expires_at": new_expiry}
+    asyncio.run(manager._check_online())
+    assert json.loads(path.read_text())["status"] == "blocked"
+
+
+def test_check_license_never_touches_the_network(manager, license_server, monkeypatch):
+    async def no_network(*args, **kwargs):
+        raise AssertionError("check_license fez uma requisição")
+
+    monkeypatch.setattr(httpx.AsyncClient, "send", no_network)
+    monkeypatch.setattr(httpx.Client, "send", no_network)
+
+    for _ in range(100):
+        is_valid, message, days = manager.check_license()
+    assert is_valid is True
+    assert days >= 29
+    assert license_server.requests == 0
@@ -0,0 +1,75 @@
+"""
+Cursor da paginação de GET /api/orders: vem do cliente, então um cursor
+malformado tem de virar 400, nunca 500 (backend online e servidor offline).
+"""
+
+import base64
+import json
+import os
+import sys
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+DESKTOP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "desktop")
+
+MALFORMED = [
+    {"a": 1},
+    [[1], {"a": 2}],
+    [1, 2],
+    ["2026-01-01T00:00:00+00:00"],
+    ["2026-01-01T00:00:00+00:00", "id", "x"],
+    [{"$gt": ""}, "id"],
+]
+
+
+def encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.fixture(scope="module")
+def offline(tmp_path_factory):
+    """server_offline com um banco temporário"""
+    os.environ["DONA_GUEDES_DB"] = str(tmp_path_factory.mktemp("offline") / "cursor.db")
+    sys.path.insert(0, DESKTOP_DIR)
+    import server_offline
+    yield server_offline
+    server_offline.db_writer.stop()
+    server_offline.db_pool.close_all()
+
+
+@pytest.mark.parametrize("value", MALFORMED)
+def test_offline_malformed_cursor_is_rejected(offline, value):
+    with TestClient(offline.app) as client:
+        response = client.get("/api/orders", params={"cursor": encode(value)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Cursor invalido"
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "e30"])
+def test_offline_undecodable_cursor_is_rejected(offline, cursor):
+    with pytest.raises(HTTPException) as error:
+        offline.decode_order_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_offline_cursor_round_trip(offline):
+    order = {"created_at": "2026-01-01T12:00:00+00:00", "id": "pedido-1"}
+    assert offline.decode_order_cursor(offline.encode_order_cursor(order)) == (order["created_at"], order["id"])
+
+
+@pytest.fixture(scope="module")
+def online():
+    """server.py sem conectar: o cliente do Motor só abre conexão na primeira consulta"""
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "test_order_cursor")
+    import server
+    return server
+
+
+@pytest.mark.parametrize("value", MALFORMED)
+def test_online_malformed_cursor_is_rejected(online, value):
+    with pytest.raises(HTTPException) as error:
+        online.decode_order_cursor(encode(value))
+    assert error.value.status_code == 400
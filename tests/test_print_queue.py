@@ -0,0 +1,212 @@
+"""
+Fila de impressão (print_queue.py) contra uma impressora ESC/POS falsa:
+um asyncio.start_server local que guarda os bytes recebidos por conexão.
+"""
+
+import asyncio
+import socket
+
+import pytest
+
+import print_queue as pq
+
+RECEIPT = b"\x1b@Pedido #1\n\n\x1dV\x00"
+
+
+class FakePrinter:
+    """Impressora na porta 9100 de mentira: `connections` tem os bytes de cada conexão.
+
+    Com `drop_after`, a primeira conexão é derrubada (RST) assim que recebe esse
+    tanto de bytes, como uma impressora reiniciando no meio do cupom.
+    """
+
+    def __init__(self, drop_after=None):
+        self.drop_after = drop_after
+        self.connections = []
+        self.closed = []            # conexões que o worker encerrou (EOF do lado de cá)
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _handle(self, reader, writer):
+        index = len(self.connections)
+        received = bytearray()
+        self.connections.append(received)
+        if self.drop_after is not None and index == 0:
+            received += await reader.readexactly(self.drop_after)
+            writer.transport.abort()
+            return
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            received += data
+        self.closed.append(index)
+        writer.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def closed_port():
+    """Porta livre e fechada: a conexão é recusada na hora"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def submit_and_wait(queue, port, parts):
+    """Enfileira e devolve (job, futuro resolvido pelo on_done)"""
+    done = asyncio.get_running_loop().create_future()
+
+    async def on_done(job):
+        done.set_result(job)
+
+    job = queue.submit("127.0.0.1", port, parts, order_id="pedido-1", on_done=on_done)
+    return job, done
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condição não atingida a tempo"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(pq, "BACKOFF_INITIAL", 0.001)
+    monkeypatch.setattr(pq, "BACKOFF_MAX", 0.01)
+
+
+def test_job_is_sent_byte_for_byte():
+    async def scenario():
+        printer = await FakePrinter().start()
+        queue = pq.PrintQueue()
+        parts = [RECEIPT, RECEIPT.replace(b"#1", b"#2")]
+        job, done = submit_and_wait(queue, printer.port, parts)
+        assert job.status == "queued"
+
+        await asyncio.wait_for(done, 2)
+        await queue.shutdown()
+        await wait_for(lambda: printer.closed == [0])
+        await printer.close()
+        return job, printer
+
+    job, printer = asyncio.run(scenario())
+    assert job.status == "done"
+    assert (job.attempts, job.printed, job.error) == (1, 2, None)
+    assert printer.connections == [bytearray(b"".join(job.parts))]
+
+
+def test_jobs_share_one_connection():
+    async def scenario():
+        printer = await FakePrinter().start()
+        queue = pq.PrintQueue()
+        _, first = submit_and_wait(queue, printer.port, [RECEIPT])
+        _, second = submit_and_wait(queue, printer.port, [RECEIPT])
+        await asyncio.wait_for(asyncio.gather(first, second), 2)
+        await queue.shutdown()
+        await wait_for(lambda: printer.closed)
+        await printer.close()
+        return printer
+
+    printer = asyncio.run(scenario())
+    assert printer.connections == [bytearray(RECEIPT * 2)]
+
+
+def test_dropped_connection_reconnects_and_resumes_the_job():
+    # Cupons grandes (logo em bitmap): o envio do 2º ainda está em andamento
+    # quando a impressora derruba a conexão depois de receber o 1º
+    first, second = b"A" * (8 << 20), b"B" * (8 << 20)
+
+    async def scenario():
+        printer = await FakePrinter(drop_after=len(first)).start()
+        queue = pq.PrintQueue()
+        job, done = submit_and_wait(queue, printer.port, [first, second])
+        await asyncio.wait_for(done, 10)
+        await queue.shutdown()
+        await wait_for(lambda: 1 in printer.closed)
+        await printer.close()
+        return job, printer
+
+    job, printer = asyncio.run(scenario())
+    assert job.status == "done"
+    assert job.attempts == 2
+    assert job.printed == 2
+    assert len(printer.connections) == 2
+    assert printer.connections[0] == first
+    # A nova tentativa continua do 2º cupom, sem reimprimir o 1º
+    assert printer.connections[1] == second
+
+
+def test_printer_down_fails_after_max_attempts():
+    async def scenario():
+        queue = pq.PrintQueue()
+        job, done = submit_and_wait(queue, closed_port(), [RECEIPT])
+        await asyncio.wait_for(done, 5)
+        await queue.shutdown()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "failed"
+    assert job.attempts == pq.MAX_ATTEMPTS == 5
+    assert job.printed == 0
+    assert job.error
+    assert job.finished_at is not None
+
+
+def test_idle_connection_is_closed(monkeypatch):
+    monkeypatch.setattr(pq, "IDLE_DISCONNECT", 0.05)
+
+    async def scenario():
+        printer = await FakePrinter().start()
+        queue = pq.PrintQueue()
+        _, done = submit_and_wait(queue, printer.port, [RECEIPT])
+        await asyncio.wait_for(done, 2)
+        # Sem novos jobs, o worker solta a impressora para os outros PCs
+        await wait_for(lambda: printer.closed == [0])
+        worker = queue.workers[("127.0.0.1", printer.port)]
+        assert worker._writer is None
+
+        # O próximo job abre uma conexão nova
+        _, done = submit_and_wait(queue, printer.port, [RECEIPT])
+        await asyncio.wait_for(done, 2)
+        await queue.shutdown()
+        await wait_for(lambda: printer.closed == [0, 1])
+        await printer.close()
+        return printer
+
+    printer = asyncio.run(scenario())
+    assert printer.connections == [bytearray(RECEIPT), bytearray(RECEIPT)]
+
+
+def test_shutdown_cancels_workers_cleanly(monkeypatch):
+    # Backoff longo: o worker da impressora fora do ar fica parado no sleep
+    monkeypatch.setattr(pq, "BACKOFF_INITIAL", 60)
+
+    async def scenario():
+        printer = await FakePrinter().start()
+        queue = pq.PrintQueue()
+        _, done = submit_and_wait(queue, printer.port, [RECEIPT])
+        await asyncio.wait_for(done, 2)
+        job = queue.submit("127.0.0.1", closed_port(), [RECEIPT])
+        await wait_for(lambda: job.attempts == 1)
+
+        tasks = [worker._task for worker in queue.workers.values()]
+        await asyncio.wait_for(queue.shutdown(), 1)
+        assert queue.workers == {}
+        assert all(task.cancelled() for task in tasks)
+        # A conexão mantida aberta com a impressora é encerrada
+        await wait_for(lambda: printer.closed == [0])
+        await printer.close()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "printing"
+    assert job.finished_at is None